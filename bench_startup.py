@@ -0,0 +1,88 @@
+# [SublimeLinter @python:3]
+
+import sys
+import os
+import subprocess
+import time
+import re
+
+
+# the gui starts a new process per command, so the cold start of dufi is
+# paid on every run; the benchmark measures it for a few commands and lists
+# the slowest modules imported by `dufi count-lines`
+
+COMMANDS = (
+    ["count-lines", "--help"],
+    ["diagnostics", "--help"],
+    ["excel-to-csv", "--help"],
+    ["xml2db-convert", "--help"],
+)
+
+RUNS = 10
+TOP_IMPORTS = 15
+
+
+def _run(args, **kwargs):
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        **kwargs)
+
+
+def measure(command, runs=RUNS):
+    # returns the best time of the runs (seconds)
+
+    best = None
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(["dufi.py"] + command, check=True)
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def get_import_times(command):
+    # returns [(cumulative time in microseconds, module)] sorted by time
+
+    proc = _run(["-X", "importtime", "dufi.py"] + command,
+                stderr=subprocess.PIPE, universal_newlines=True)
+    times = []
+
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s*\d+ \|\s*(\d+) \|( *)(\S+)", line)
+
+        if m:
+            times.append((int(m.group(1)), m.group(2) + m.group(3)))
+
+    times.sort(reverse=True)
+    return times
+
+
+def main(argv=sys.argv):
+    runs = int(argv[1]) if len(argv) > 1 else RUNS
+
+    print("python: {}".format(sys.version.split()[0]))
+    print("best of {} runs:".format(runs))
+
+    # the first run warms up the file cache and compiles *.pyc files
+    _run(["dufi.py"] + COMMANDS[0])
+
+    for command in COMMANDS:
+        print("  {:<32} {:7.1f} ms".format(
+            " ".join(command), measure(command, runs) * 1000))
+
+    print("slowest imports of `{}`:".format(" ".join(COMMANDS[0])))
+
+    for us, module in get_import_times(COMMANDS[0])[:TOP_IMPORTS]:
+        print("  {:9.1f} ms  {}".format(us / 1000, module))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,20 @@
 # [SublimeLinter @python:3]
 
 import sys
-import dufi.gui
+from multiprocessing import freeze_support
 
 
 def main(argv=sys.argv):
+    # commands are run by the same executable as the gui, but they do not
+    # need tkinter and the gui modules
+    if len(argv) > 1:
+        import dufi.cli
+        return dufi.cli.run(argv)
+
+    import dufi.gui
     return dufi.gui.main(argv)
-    pass
 
 
 if __name__ == "__main__":
+    freeze_support()
     sys.exit(main())
@@ -4,8 +4,13 @@
 import sys
 import os
 import argparse
+import traceback
 
 from . import dufi_commands, __version__
+from .commands.progress import set_trace
+from .commands.cache import set_cache_enabled
+from .commands.events import open_event_channel, send_file_end
+from .worker import WORKER_ARG, serve
 
 
 def main(argv=sys.argv):
@@ -21,10 +26,30 @@ def main(argv=sys.argv):
         action="version",
         version="%(prog)s v{}".format(__version__),
     )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="print throughput (MB/s, rows/s) along with the progress",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=("do not use facts about files (encoding, EOL style, etc.) saved "
+              "by previous runs and do not save them"),
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        metavar="FD",
+        help=("send progress, files, throughput and warnings as "
+              "length-prefixed JSON frames to the pipe FD (a handle on "
+              "Windows) instead of progress messages"),
+    )
     parser.set_defaults(command=None)
 
     subparsers = parser.add_subparsers(
         title="dufi commands",
+        dest="cli_command",
     )
 
     for cmd in dufi_commands:
@@ -36,7 +61,38 @@ def main(argv=sys.argv):
         parser.print_help()
         return 1
 
-    return args.command(args)
+    error = args.check_args(args)
+
+    if error:
+        subparsers.choices[args.cli_command].error(error)
+
+    set_trace(args.trace)
+    set_cache_enabled(not args.no_cache)
+    open_event_channel(args.events)
+
+    result = args.command(args)
+    send_file_end()
+
+    return result
+
+
+def run(argv=sys.argv):
+    # runs a command started by the gui executable (which has no console if
+    # it is frozen), so errors are returned as an exit code
+
+    if argv[1:2] == [WORKER_ARG]:
+        return serve(int(argv[2]) if len(argv) > 2 else None)
+
+    try:
+        return main(argv)
+    except SystemExit as e:
+        return e.code
+    except:
+        if sys.stderr is None or sys.stderr.closed:
+            raise
+
+        traceback.print_exception(*sys.exc_info(), file=sys.stderr)
+        return 1
 
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ from . import (
     cmd_patch,
     cmd_concat,
     cmd_sample,
+    cmd_index,
     cmd_tika,
     cmd_xml2db_schema,
     cmd_xml2db_scripts,
@@ -4,6 +4,7 @@ import sys
 import os
 from glob import glob
 
+from .events import send_event, send_file_start
 from ..utils import echo
 
 
@@ -77,6 +78,15 @@ def type_single_byte(s):
     return b
 
 
+def type_positive_int(s):
+    n = int(s)
+
+    if n < 1:
+        raise ValueError(s)
+
+    return n
+
+
 def get_separator(args):
     if getattr(args, "tab_separator", False):
         sep = b"\t"[0]
@@ -114,12 +124,24 @@ def process_files(args):
     files = get_files(args)
 
     for i, file in enumerate(files, 1):
-        echo("Processing {}/{}: {}".format(i, len(files), os.path.basename(file)))
+        echo_processing(i, len(files), file)
         yield file
 
 
+def echo_processing(i, count, file):
+    echo("Processing {}/{}: {}".format(i, count, os.path.basename(file)))
+    send_file_start(i, count, file)
+
+
+def echo_warning(message):
+    echo("WARNING: {}".format(message))
+    send_event("warning", message=message)
+
+
 def get_files(args, _cache={}):
-    if "files" in _cache:
+    # the list is cached for the arguments of the current run only, since a
+    # worker process runs many commands
+    if _cache.get("args") is args:
         return _cache["files"]
 
     files = []
@@ -144,7 +166,7 @@ def get_files(args, _cache={}):
 
     for file in files:
         if not os.path.exists(file):
-            echo("WARNING: file not found:", file)
+            echo_warning("file not found: {}".format(file))
             continue
 
         if file in result:
@@ -152,5 +174,6 @@ def get_files(args, _cache={}):
 
         result.append(file)
 
+    _cache["args"] = args
     _cache["files"] = result
     return result
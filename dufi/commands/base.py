@@ -1,9 +1,9 @@
 # [SublimeLinter @python:3]
 
-import sys
 import re
 
 from .arghelpers import type_single_byte, FakeParser
+from ..utils import get_exe_args
 
 
 class dufi_commands_meta(type):
@@ -122,12 +122,17 @@ class Command(metaclass=CommandMeta):
         parser = subparsers.add_parser(
             cls.cli_command, aliases=cls.cli_command_aliases, help=cls.cli_command_help)
         cls._add_arguments(parser)
-        parser.set_defaults(command=cls.run)
+        parser.set_defaults(command=cls.run, check_args=cls.check_args)
 
     @classmethod
     def _add_arguments(cls, parser):
         pass
 
+    @classmethod
+    def check_args(cls, args):
+        # returns an error message if the parsed arguments are inconsistent
+        return None
+
     @staticmethod
     def _add_csv_arguments(p, qualifier=True):
         p.add_argument(
@@ -165,6 +170,44 @@ class Command(metaclass=CommandMeta):
             help="convert characters to encoding",
         )
 
+    @staticmethod
+    def _add_patch_arguments(p):
+        p.add_argument(
+            "-B", "--binary-patch",
+            action="store_true",
+            help=("save the patch in the compact binary format instead of "
+                  "the text one"),
+        )
+        p.add_argument(
+            "-I", "--in-place-stream",
+            action="store_true",
+            help=("apply replacements to the file while scanning it instead "
+                  "of applying the saved patch afterwards"),
+        )
+        p.add_argument(
+            "-N", "--no-journal",
+            action="store_true",
+            help=("do not save the patch (--in-place-stream must be set); "
+                  "the changes cannot be reverted then"),
+        )
+        p.add_argument(
+            "-F", "--force",
+            action="store_true",
+            help=("continue patching in place even if an unexpected char is "
+                  "found (--in-place-stream must be set)"),
+        )
+
+    @staticmethod
+    def _add_jobs_arguments(p):
+        p.add_argument(
+            "-j", "--jobs",
+            type=int,
+            default=1,
+            metavar="N",
+            help=("number of processes to run in parallel (0 - number of CPU "
+                  "cores; default: 1)"),
+        )
+
     @staticmethod
     def _add_files_arguments(p):
         p.add_argument(
@@ -234,11 +277,7 @@ class Command(metaclass=CommandMeta):
         if cls.cli_command is None:
             raise ValueError("{} is not executable".format(cls.gui_command))
 
-        args = [sys.executable, ]
-
-        if not getattr(sys, "frozen", False):
-            args.append(sys.argv[0])
-
+        args = get_exe_args()
         args.append(cls.cli_command)
         args.extend(cls._get_cmd_args(app.var))
         args.extend(["--list", "--", "-"])
@@ -0,0 +1,104 @@
+# [SublimeLinter @python:3]
+
+import os
+import json
+import hashlib
+
+
+CACHE_FILE_EXT = ".dufcache"
+CACHE_VERSION = 1
+
+# blocks at the beginning, in the middle and at the end of a file are
+# hashed to notice changes which keep its size and mtime
+HASH_BLOCK_SIZE = 64 * 1024
+
+_enabled = True
+
+
+def set_cache_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_cache_enabled():
+    return _enabled
+
+
+class FileCache():
+
+    # facts about a data file (encoding, EOL style, results of scans) saved
+    # into a sidecar file next to it; the facts are dropped as soon as the
+    # file changes
+    #
+    # the signature of the file is taken when the cache is opened, so the
+    # facts found by a command are bound to the content it has scanned
+
+    def __init__(self, file, enabled=True):
+        super().__init__()
+
+        self._file = file
+        self._cache_file = file + CACHE_FILE_EXT
+        self._entries = {}
+        self._signature = None
+        self._enabled = enabled and _enabled
+
+        if self._enabled:
+            self._signature = self._get_signature()
+            self._load()
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def set(self, key, value):
+        if not self._enabled:
+            return
+
+        self._entries[key] = value
+        self._save()
+
+    def _get_signature(self):
+        stat = os.stat(self._file)
+        size = stat.st_size
+        md5 = hashlib.md5()
+
+        with open(self._file, "rb") as fp:
+            for offset in sorted({0,
+                                  max(size // 2 - HASH_BLOCK_SIZE // 2, 0),
+                                  max(size - HASH_BLOCK_SIZE, 0)}):
+                fp.seek(offset)
+                md5.update(fp.read(HASH_BLOCK_SIZE))
+
+        return [size, stat.st_mtime_ns, md5.hexdigest()]
+
+    def _load(self):
+        try:
+            with open(self._cache_file, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) \
+                or data.get("version") != CACHE_VERSION \
+                or data.get("signature") != self._signature:
+            return
+
+        entries = data.get("entries")
+
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def _save(self):
+        data = {"version": CACHE_VERSION,
+                "signature": self._signature,
+                "entries": self._entries}
+
+        tmp_file = self._cache_file + ".tmp"
+
+        # the cache is optional, so a read-only location is not an error
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as fp:
+                json.dump(data, fp)
+
+            os.replace(tmp_file, self._cache_file)
+        except OSError:
+            pass
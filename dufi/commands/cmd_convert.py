@@ -3,12 +3,16 @@
 import os
 import codecs
 import re
+import shutil
+import tempfile
 from pathlib import Path
 
-from .iconv import iconv
+from .iconv import iconv, BUFFER_SIZE
 
 from .base import Command, InvalidCommandArgs
-from .arghelpers import GUIOpt, format_file_path, get_separator, process_files
+from .arghelpers import GUIOpt, format_file_path, get_separator, \
+    process_files, get_files, echo_processing
+from .parallel import get_jobs, get_pool
 from ..utils import echo
 
 
@@ -65,6 +69,11 @@ Quotation marks inside text fields must be doubled
 
     @classmethod
     def run(cls, args):
+        jobs = get_jobs(args)
+
+        if jobs > 1 and len(get_files(args)) > 1:
+            return cls._run_parallel(args, jobs)
+
         for i, file in enumerate(process_files(args)):
             file = os.path.abspath(file)
             file_out = os.path.abspath(format_file_path(args.output, file))
@@ -79,28 +88,84 @@ Quotation marks inside text fields must be doubled
                 with open(file_out, "w"):
                     pass
 
-            if args.convert_format:
-                separator = get_separator(args)
-            else:
-                separator = None
+            iconv(inputfile=file, output=file_out, jobs=jobs,
+                  **cls._get_iconv_args(args, i))
 
-            drop_first_row = args.drop_first_row
+        return 0
 
-            if args.except_first_file:
-                if args.drop_first_row:
-                    if not i:
-                        drop_first_row = False
+    @classmethod
+    def _run_parallel(cls, args, jobs):
+        # each file is converted into a temporary segment by a worker
+        # process; the segments are appended to the outputs in the order of
+        # the input files, so the result is the same as of a sequential run
 
-            iconv(from_code=args.from_code,
-                  to_code=args.to_code,
-                  inputfile=file,
-                  output=file_out,
-                  separator=separator,
-                  with_qualifier=args.with_qualifier,
-                  add_filename=args.add_filename,
-                  drop_first_row=drop_first_row)
+        files = get_files(args)
+        tasks = []
+        result = 0
 
-        return 0
+        for i, file in enumerate(files):
+            file = os.path.abspath(file)
+            file_out = os.path.abspath(format_file_path(args.output, file))
+
+            if Path(file) == Path(file_out):
+                result = 1
+                break
+
+            os.makedirs(os.path.dirname(file_out), exist_ok=True)
+            tasks.append((file, file_out))
+
+        if tasks:
+            tmp_dir_base = os.path.dirname(tasks[0][1])
+
+            with tempfile.TemporaryDirectory(dir=tmp_dir_base) as tmp_dir, \
+                    get_pool(jobs) as pool:
+                futures = []
+
+                for i, (file, file_out) in enumerate(tasks):
+                    segment = os.path.join(tmp_dir, "{}.part".format(i))
+                    futures.append(pool.submit(
+                        iconv, inputfile=file, output=segment,
+                        **cls._get_iconv_args(args, i)))
+
+                for i, ((file, file_out), future) \
+                        in enumerate(zip(tasks, futures)):
+                    echo_processing(i + 1, len(files), file)
+                    future.result()
+
+                    segment = os.path.join(tmp_dir, "{}.part".format(i))
+
+                    with open(segment, "rb") as fpi, \
+                            open(file_out, "ab" if i else "wb") as fpo:
+                        shutil.copyfileobj(fpi, fpo, BUFFER_SIZE)
+
+                    os.remove(segment)
+
+        if result:
+            echo_processing(len(tasks) + 1, len(files), files[len(tasks)])
+            echo("ERROR: input and output files must be different")
+
+        return result
+
+    @staticmethod
+    def _get_iconv_args(args, i):
+        if args.convert_format:
+            separator = get_separator(args)
+        else:
+            separator = None
+
+        drop_first_row = args.drop_first_row
+
+        if args.except_first_file:
+            if args.drop_first_row:
+                if not i:
+                    drop_first_row = False
+
+        return {"from_code": args.from_code,
+                "to_code": args.to_code,
+                "separator": separator,
+                "with_qualifier": args.with_qualifier,
+                "add_filename": args.add_filename,
+                "drop_first_row": drop_first_row}
 
     ############################################################################
 
@@ -139,6 +204,7 @@ Quotation marks inside text fields must be doubled
             **guiopt(action="browse_file")
         )
 
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -1,10 +1,21 @@
 # [SublimeLinter @python:3]
 
+import os
+
 from .base import Command
 from .arghelpers import get_files
+from .parallel import get_jobs, get_pool
+from .progress import Progress
+from .eol import EOL_BLOCK_SIZE, EOLCounter
+from .cache import FileCache
+from .index import get_indexed_lines
 from ..utils import echo
 
 
+# lines are counted by blocks; a bytes object per line is not created
+COUNT_BLOCK_SIZE = 4 * EOL_BLOCK_SIZE
+
+
 class CountLinesCommand(Command):
 
     cli_command = "count-lines"
@@ -21,18 +32,44 @@ class CountLinesCommand(Command):
 
     @classmethod
     def run(cls, args):
-        for fname in get_files(args):
-            count = 0
+        files = get_files(args)
+        jobs = min(get_jobs(args), len(files))
 
-            for _ in open(fname, "rb"):
-                count += 1
+        # files are counted by worker processes, but the results are printed
+        # in the order of the files
+        if jobs > 1:
+            with get_pool(jobs) as pool:
+                futures = [pool.submit(count_lines, fname, args.stats,
+                                       use_cache=not args.no_cache)
+                           for fname in files]
 
-            echo("{}: {}".format(fname, count))
+                for fname, future in zip(files, futures):
+                    cls._echo_result(fname, *future.result())
+        else:
+            for fname in files:
+                cls._echo_result(fname, *count_lines(
+                    fname, args.stats, True, not args.no_cache))
+
+    @staticmethod
+    def _echo_result(fname, lines, stats):
+        if stats is None:
+            echo("{}: {}".format(fname, lines))
+            return
+
+        size, crlf, lf, cr = stats
+        echo("{}: {} (size: {} bytes; CR+LF: {}, LF: {}, bare CR: {})".format(
+            fname, lines, size, crlf, lf, cr))
 
     ############################################################################
 
     @classmethod
     def _add_arguments(cls, parser):
+        parser.add_argument(
+            "-S", "--stats",
+            action="store_true",
+            help="print the size and the numbers of CR+LF, LF and CR as well",
+        )
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -46,3 +83,68 @@ class CountLinesCommand(Command):
     @classmethod
     def _get_cmd_args(cls, var):
         return []
+
+
+def count_lines(fname, stats=False, show_progress=False, use_cache=True):
+    # returns the number of lines (the last line may have no EOL) and, if
+    # stats are requested, [size, CR+LF, LF, CR]; the results are taken from
+    # the index or the cache of the file if they are up to date
+
+    cache = FileCache(fname, use_cache)
+    cache_key = "line_stats" if stats else "lines"
+    cached = cache.get(cache_key)
+
+    if cached is not None:
+        return cached if stats else (cached, None)
+
+    if not stats:
+        lines = get_indexed_lines(fname)
+
+        if lines is not None:
+            return lines, None
+
+    size = os.path.getsize(fname)
+    counter = EOLCounter() if stats else None
+    progress = Progress(size) if show_progress else None
+
+    lines = 0
+    pos = 0
+    last = b""
+
+    with open(fname, "rb") as fp:
+        fp_read = fp.read
+
+        while True:
+            block = fp_read(COUNT_BLOCK_SIZE)
+
+            if not block:
+                break
+
+            if counter is not None:
+                counter.feed(block)
+            else:
+                lines += block.count(b"\n")
+
+            pos += len(block)
+            last = block[-1:]
+
+            if progress is not None:
+                progress.update(pos)
+
+    if counter is not None:
+        counter.close()
+        lines = counter.lines
+
+    if last and last != b"\n":
+        lines += 1
+
+    if progress is not None:
+        progress.finish(pos, lines)
+
+    if stats:
+        result = [lines, [size, counter.crlf, counter.lf, counter.cr]]
+        cache.set(cache_key, result)
+        return result
+
+    cache.set(cache_key, lines)
+    return lines, None
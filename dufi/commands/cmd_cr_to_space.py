@@ -1,10 +1,14 @@
 # [SublimeLinter @python:3]
 
 import os
+from concurrent.futures import as_completed
 
 from .base import Command
-from .arghelpers import process_files
-from .cdufi import cr_to_space
+from .arghelpers import process_files, echo_warning
+from .parallel import get_jobs, get_pool, split_file
+from .progress import Progress
+from .eol import EOL_BLOCK_SIZE, count_eols
+from .cdufi import cr_to_space, cr_to_space_range
 
 
 class CRToSpaceCommand(Command):
@@ -24,14 +28,55 @@ class CRToSpaceCommand(Command):
 
     @classmethod
     def run(cls, args):
+        jobs = get_jobs(args)
+
         for file in process_files(args):
+            cls._check_bare_cr(file)
+
+            if jobs > 1:
+                ranges = split_file(file, jobs)
+
+                if len(ranges) > 1:
+                    cls._cr_to_space_parallel(file, ranges, jobs)
+                    continue
+
             with open(file, "r+b") as fp:
                 cr_to_space(fp, os.path.getsize(file))
 
+    @staticmethod
+    def _check_bare_cr(file):
+        # CR which is not followed by LF is a line ending of old Mac files;
+        # it is replaced by space as well, so such lines would be joined
+
+        with open(file, "rb") as fp:
+            counter = count_eols(fp.read(EOL_BLOCK_SIZE))
+
+        if counter.cr:
+            echo_warning("file contains CR characters not followed by LF; "
+                         "they are replaced by spaces as well")
+
+    @staticmethod
+    def _cr_to_space_parallel(file, ranges, jobs):
+        # every process maps the file and replaces CR in its own range
+        progress = Progress(os.path.getsize(file))
+        done = 0
+
+        with get_pool(jobs) as pool:
+            futures = {pool.submit(cr_to_space_range, file, start, stop):
+                       stop - start for start, stop in ranges}
+
+            for future in as_completed(futures):
+                future.result()
+                done += futures[future]
+                progress.update(done)
+
+        progress.finish(done)
+
     ############################################################################
 
     @classmethod
     def _add_arguments(cls, parser):
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
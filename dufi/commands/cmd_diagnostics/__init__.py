@@ -1,11 +1,18 @@
 # [SublimeLinter @python:3]
 
 import os
+from concurrent.futures import as_completed
 
 from .encoding import detect_encoding
 from ..base import Command
 from ..arghelpers import get_separator, process_files
-from ..cdufi import count_seps_with_quotes, count_seps_no_quoting
+from ..parallel import get_jobs, get_pool, split_file
+from ..eol import count_eols_in_file
+from ..cache import FileCache
+from ..report import ReportWriter, get_report_file
+from ..progress import Progress
+from ..cdufi import count_seps_with_quotes, count_seps_no_quoting, \
+    count_seps_range
 from ...utils import echo
 
 
@@ -55,6 +62,11 @@ If not checked, non-Cyrillyc encodings can be detected.
     ############################################################################
 
     CHECK_EOL_LIMIT = 50_000
+    PREFIX_BLOCK_SIZE = 1024 * 1024
+
+    # the prefix is kept in memory for the encoding detector, so a file with
+    # long lines is not read whole; EOLs past it are counted by blocks
+    PREFIX_SIZE_LIMIT = 4 * PREFIX_BLOCK_SIZE
 
     @classmethod
     def run(cls, args):
@@ -76,86 +88,185 @@ If not checked, non-Cyrillyc encodings can be detected.
 
     @classmethod
     def _check_file(cls, file, args):
-        # check eof
+        cache = FileCache(file)
 
         if not args.exclude_compat_tests:
-            with open(file, "rb") as fp:
-                fp.seek(-1, os.SEEK_END)
+            cls._check_compat(file, args, cache)
 
-                last_char = fp.read(1)
+        # count separators
+        report_file = get_report_file(file)
+        qualifier = b'"'[0] if args.with_qualifier else -1
 
-            if last_char == b"\0":
-                raise DiagnosticsError("file ends with 0x00 character (unicode?)")
+        # the cached result is valid only along with the report it was
+        # written with
+        cache_key = "seps:{}:{}".format(get_separator(args), qualifier)
+        cached = cache.get(cache_key)
 
-            if last_char != b"\n":
-                raise DiagnosticsError("file does not end with EOL sequence")
+        if cached is not None and os.path.exists(report_file) \
+                and os.stat(report_file).st_mtime_ns == cached[2]:
+            echo("Separators were counted before, the report is up to date")
+            return cached[0], cached[1]
 
-            # check eol
-            if cls._get_eol_style(file) not in ("windows", "unix"):
-                raise DiagnosticsError("file contains both Windows and Unix EOLs")
+        valid, fixable = cls._count_seps(file, report_file, args, qualifier)
+        cache.set(cache_key, [valid, fixable,
+                              os.stat(report_file).st_mtime_ns])
 
-            # check encoding
-            encoding = detect_encoding(
-                file, args.lines_limit, cyrillic=not args.non_cyrillic)
+        return valid, fixable
 
-            if encoding.lower().startswith("utf"):
-                raise DiagnosticsError("file has an Unicode encoding")
-
-        # count separators
-        report_file = file + ".dufireport"
+    @classmethod
+    def _count_seps(cls, file, report_file, args, qualifier):
         file_size = os.path.getsize(file)
+        separator = get_separator(args)
 
-        with open(file, "rb") as fpi, \
-                open(report_file, "w") as fpo:
-            if args.with_qualifier:
-                return count_seps_with_quotes(
-                    fpi, fpo, file_size, get_separator(args), b'"'[0], -1)
-            else:
-                return count_seps_no_quoting(
-                    fpi, fpo, file_size, get_separator(args), -1)
+        # the quoted state is reset at the beginning of each line, so files
+        # with qualifiers can be split by lines as well; a single job scans
+        # the file sequentially without a pool
+        jobs = get_jobs(args)
+        ranges = split_file(file, jobs) if jobs > 1 else [(0, file_size)]
+
+        with open(report_file, "w") as fpo:
+            report = ReportWriter(fpo, file, separator, qualifier)
+
+            if len(ranges) > 1:
+                return cls._count_seps_parallel(
+                    file, report, ranges, separator, qualifier, jobs)
+
+            with open(file, "rb") as fpi:
+                if args.with_qualifier:
+                    return count_seps_with_quotes(
+                        fpi, report, file_size, separator, qualifier)
+                else:
+                    return count_seps_no_quoting(
+                        fpi, report, file_size, separator)
+
+    @classmethod
+    def _count_seps_parallel(cls, file, report, ranges, separator, qualifier,
+                             jobs):
+        # the first line sets the expected number of separators, so it is
+        # counted before the ranges are sent to the worker processes
+
+        with open(file, "rb") as fp:
+            first_line_size = len(fp.readline())
+
+        _, ((_, _, expected_count), ) = count_seps_range(
+            file, 0, first_line_size, separator, qualifier, -1)
+
+        report.set_expected(expected_count)
+
+        progress = Progress(os.path.getsize(file))
+        done = 0
+
+        with get_pool(jobs) as pool:
+            futures = {}
+
+            for start, stop in ranges:
+                future = pool.submit(count_seps_range,
+                                     file, start, stop, separator, qualifier,
+                                     expected_count)
+                futures[future] = stop - start
+
+            for future in as_completed(futures):
+                done += futures[future]
+                progress.update(done)
+
+            progress.finish(done)
+
+            results = [future.result() for future in futures]
+
+        valid = True
+        fixable = True
+        line_offset = 0
+
+        for lines, deviations in results:
+            for n, offset, count in deviations:
+                report.add(line_offset + n, offset, count)
+                valid = False
+
+                if count > expected_count:
+                    fixable = False
+
+            line_offset += lines
+
+        report.close(line_offset)
+
+        return valid, fixable
 
     @classmethod
-    def _get_eol_style(cls, fname):
-        with open(fname, "rb") as fp:
-            eol_win = False
-            eol_unix = False
+    def _check_compat(cls, file, args, cache):
+        # the EOL check and the encoding detector share the blocks read from
+        # the beginning of the file; their results are cached
 
-            pc = None
-            i = 0
+        with open(file, "rb") as fp:
+            # check eof
+            if os.fstat(fp.fileno()).st_size:
+                fp.seek(-1, os.SEEK_END)
+                last_char = fp.read(1)
+                fp.seek(0)
+            else:
+                last_char = b""
 
-            while True:
-                cc = fp.read(1)
+            if last_char == b"\0":
+                raise DiagnosticsError("file ends with 0x00 character (unicode?)")
 
-                if not cc:
-                    break
+            if last_char != b"\n":
+                raise DiagnosticsError("file does not end with EOL sequence")
 
-                if cc == b"\n":
-                    if pc == b"\r":
-                        eol_win = True
+            prefix = None
 
-                        if eol_unix:
-                            return "mixed"
+            # check eol
+            eol_key = "eol_style_full" if args.eol_full_scan else "eol_style"
+            eol_style = cache.get(eol_key)
+
+            if eol_style is None:
+                prefix = cls._read_prefix(fp)
+
+                if args.eol_full_scan:
+                    eol_style = count_eols_in_file(
+                        fp, stop_on_mixed=True, head=prefix).style
+                else:
+                    eol_style = count_eols_in_file(
+                        fp, lines_limit=cls.CHECK_EOL_LIMIT,
+                        head=prefix).style
+
+                cache.set(eol_key, eol_style)
+
+            if eol_style not in ("windows", "unix"):
+                raise DiagnosticsError("file contains both Windows and Unix EOLs")
+
+            # check encoding
+            encoding_key = "encoding:{}:{}".format(
+                "general" if args.non_cyrillic else "cyrillic", args.lines_limit)
+            encoding = cache.get(encoding_key)
 
-                    else:
-                        eol_unix = True
+            if encoding is None:
+                encoding = detect_encoding(
+                    file, args.lines_limit, cyrillic=not args.non_cyrillic,
+                    head=prefix)
+                cache.set(encoding_key, encoding)
 
-                        if eol_win:
-                            return "mixed"
+            if encoding.lower().startswith("utf"):
+                raise DiagnosticsError("file has an Unicode encoding")
 
-                    i += 1
+    @classmethod
+    def _read_prefix(cls, fp):
+        # reads blocks until CHECK_EOL_LIMIT lines or PREFIX_SIZE_LIMIT bytes
+        # are read
 
-                    if i >= cls.CHECK_EOL_LIMIT:
-                        break
+        blocks = []
+        lines = 0
+        size = 0
 
-                pc = cc
+        while lines < cls.CHECK_EOL_LIMIT and size < cls.PREFIX_SIZE_LIMIT:
+            block = fp.read(cls.PREFIX_BLOCK_SIZE)
 
-            if eol_win:
-                return "windows"
+            if not block:
+                break
 
-            if eol_unix:
-                return "unix"
+            blocks.append(block)
+            lines += block.count(b"\n")
+            size += len(block)
 
-            return "unknown"
+        return b"".join(blocks)
 
     ############################################################################
 
@@ -173,14 +284,21 @@ If not checked, non-Cyrillyc encodings can be detected.
             help=("csv files have characters different from characters that "
                   "belong to Latin or Cyrillic alphabets"),
         )
+        parser.add_argument(
+            "-E", "--eol-full-scan",
+            action="store_true",
+            help=("check line endings in the whole file instead of the first "
+                  "{} lines".format(cls.CHECK_EOL_LIMIT)),
+        )
         parser.add_argument(
             "-m", "--lines-limit",
             type=int,
             default=1000,
             metavar="N",
-            help=("maximum number of lines which will be used to detect file "
-                  "encoding (default: 1000)"),
+            help=("maximum number of lines of each sampled part of a file "
+                  "which will be used to detect file encoding (default: 1000)"),
         )
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -1,8 +1,9 @@
 # [SublimeLinter @python:3]
 
+import os
+import time
 import codecs
 import ctypes
-from chardet.universaldetector import UniversalDetector
 
 
 def get_active_code_page():
@@ -24,6 +25,27 @@ CYRILLIC_ENCODINGS = ("cp1251", "utf_8", "iso8859_5", "cp866", "cp855", "koi8_r"
 CYRILLIC_ENCODINGS = [normalize_encoding(x) for x in CYRILLIC_ENCODINGS]
 
 
+# lowercase Russian letters from the most frequent one to the least
+# frequent one; used to choose between single-byte Cyrillic encodings
+CYRILLIC_LETTERS_BY_FREQUENCY = "оеаинтсрвлкмдпуяыьгзбчйхжшюцщэфъё"
+
+# UTF-32 BOMs start with UTF-16 ones, so they are checked first
+UNICODE_BOMS = ((codecs.BOM_UTF32_LE, "utf-32"),
+                (codecs.BOM_UTF32_BE, "utf-32"),
+                (codecs.BOM_UTF16_LE, "utf-16"),
+                (codecs.BOM_UTF16_BE, "utf-16"))
+
+# the encoding is detected by windows taken from the beginning, the middle
+# and the end of the file
+SAMPLE_WINDOW_SIZE = 64 * 1024
+SAMPLE_WINDOWS = 3
+
+# chardet is fed until it is done or the time is out, seconds
+DETECTOR_TIME_LIMIT = 1.0
+
+ASCII_BYTES = bytes(range(128))
+
+
 def cmp_encoding(a, b):
     return normalize_encoding(a) == normalize_encoding(b)
 
@@ -47,219 +69,201 @@ def get_cp_encoding(code_page):
         return "cp{}".format(code_page)
 
 
-def detect_encoding(filename, lines_limit=50000, cyrillic=True, **kwargs):
-    _detect_encoding = _detect_encoding_general
+def detect_encoding(filename, lines_limit=1000, cyrillic=True, head=None):
+    # head is the data already read from the beginning of the file, if any
 
-    if cyrillic:
-        _detect_encoding = _detect_encoding_cyrillic
+    # the BOM is checked on the raw bytes, since the first window is empty
+    # if the first line does not fit into it
+    encoding = detect_bom(filename, head)
 
-    return _detect_encoding(filename, lines_limit, **kwargs)
+    if encoding is not None:
+        return encoding
 
+    windows = read_sample_windows(filename, lines_limit, head)
 
-def _detect_encoding_general(filename, lines_limit):
-    detector = UniversalDetector()
-    feeded = 0
+    if cyrillic:
+        return _detect_encoding_cyrillic(windows)
 
-    for i, line in enumerate(open(filename, "rb")):
-        try:
-            line.decode("ascii")
-        except UnicodeDecodeError:
-            pass
-        else:
-            if i > 0:
-                continue
+    return _detect_encoding_general(windows)
 
-        detector.feed(line)
-        feeded += 1
 
-        if detector.done:
-            break
+def detect_bom(filename, head=None):
+    # returns the encoding given by the BOM of the file or None
 
-        if lines_limit and i == lines_limit:
-            break
+    if head is None or len(head) < len(codecs.BOM_UTF32_LE):
+        with open(filename, "rb") as fp:
+            head = fp.read(len(codecs.BOM_UTF32_LE))
 
-    detector.close()
-    encoding = detector.result["encoding"]
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf_8_sig"
 
-    if not encoding:
-        raise RuntimeError("cannot detect file encoding")
+    for bom, encoding in UNICODE_BOMS:
+        if head.startswith(bom):
+            return normalize_encoding(encoding)
 
-    try:
-        return normalize_encoding(encoding)
-    except ValueError:
-        raise RuntimeError("cannot detect file encoding")
+    return None
 
 
-def _detect_encoding_cyrillic(filename, lines_limit, elasticity=3):
-    fp = open(filename, "rb")
+def read_sample_windows(filename, lines_limit=None, head=None):
+    # returns up to SAMPLE_WINDOWS chunks of the file which consist of whole
+    # lines; each chunk has no more than lines_limit lines
 
-    try:
-        return _do_detect_encoding_cyrillic(iter(fp), lines_limit, elasticity)
-    finally:
-        fp.close()
+    windows = []
 
+    with open(filename, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
 
-def _do_detect_encoding_cyrillic(it, limit, elasticity):
-    lines = []
-    count = 0
+        if size <= SAMPLE_WINDOW_SIZE * SAMPLE_WINDOWS:
+            offsets = [0]
+            window_size = size
+        else:
+            offsets = [(size - SAMPLE_WINDOW_SIZE) * i // (SAMPLE_WINDOWS - 1)
+                       for i in range(SAMPLE_WINDOWS)]
+            window_size = SAMPLE_WINDOW_SIZE
 
-    cnt, eof = _read_lines(it, lines, limit)
-    count += cnt
+        for offset in offsets:
+            if not offset and head is not None and len(head) >= window_size:
+                data = head[:window_size]
+            else:
+                fp.seek(offset)
+                data = fp.read(window_size)
 
-    while not lines and (count / limit < elasticity):
-        cnt, eof = _read_lines(it, lines, limit)
-        count += cnt
+            windows.append(_cut_lines(
+                data, lines_limit,
+                skip_first=offset > 0,
+                keep_last=offset + window_size >= size))
 
-        if eof:
-            break
+    return windows
 
-    if not lines:
-        return "cp1251"
 
-    if lines[0].startswith(codecs.BOM_UTF8):
-        return "utf_8_sig"
+def _cut_lines(data, lines_limit, skip_first, keep_last):
+    start = 0
+    end = len(data)
 
-    detector_encoding = _get_detector_encoding(lines)
+    # the first and the last lines of a window may be incomplete
+    if skip_first:
+        start = data.find(b"\n") + 1
 
-    if detector_encoding:
-        if detector_encoding.startswith("utf_16") \
-                or detector_encoding.startswith("utf_32") \
-                or cmp_encoding(detector_encoding, "utf_8_sig"):
-            return detector_encoding
+    if not keep_last:
+        end = max(data.rfind(b"\n") + 1, start)
 
-    encodings = {x: True for x in CYRILLIC_ENCODINGS}
+    if lines_limit:
+        pos = start - 1
 
-    while True:
-        valid = 0
+        for _ in range(lines_limit):
+            pos = data.find(b"\n", pos + 1, end)
 
-        for encoding, status in encodings.items():
-            if not status:
-                continue
+            if pos < 0:
+                break
+        else:
+            end = pos + 1
 
-            if _test_encoding(lines, encoding):
-                valid += 1
-            else:
-                encodings[encoding] = False
+    return data[start:end]
 
-        if valid == 0:
-            if detector_encoding:
-                return detector_encoding
 
-            raise ValueError("cannot detect encoding")
+def _detect_encoding_general(windows):
+    # chardet is slow to import and it is not needed for cyrillic files
+    from chardet.universaldetector import UniversalDetector
+
+    detector = UniversalDetector()
+    deadline = time.monotonic() + DETECTOR_TIME_LIMIT
 
-        if valid == 1:
-            for encoding, status in encodings.items():
-                if status:
-                    return encoding
+    for data in windows:
+        for i in range(0, len(data), 4096):
+            detector.feed(data[i:i+4096])
 
-        if eof:
-            break
+            if detector.done or time.monotonic() > deadline:
+                break
 
-        if count / limit >= elasticity:
+        if detector.done or time.monotonic() > deadline:
             break
 
-        cnt, eof = _read_lines(it, lines, limit)
-        count += cnt
+    detector.close()
+    encoding = detector.result["encoding"]
 
-    detector_encoding = _get_detector_encoding(lines, encodings)
+    if not encoding:
+        raise RuntimeError("cannot detect file encoding")
 
-    if detector_encoding:
-        return detector_encoding
+    try:
+        return normalize_encoding(encoding)
+    except ValueError:
+        raise RuntimeError("cannot detect file encoding")
 
-    for encoding in CYRILLIC_ENCODINGS:
-        if encodings.get(encoding, False):
-            if not encoding.startswith("utf"):
-                return encoding
 
-    for encoding in CYRILLIC_ENCODINGS:
-        if encodings.get(encoding, False):
-            return encoding
+def _detect_encoding_cyrillic(windows):
+    # a window is empty if a line does not fit into it, the other windows
+    # are used then
+    windows = [data for data in windows if data]
 
-    raise ValueError("cannot detect encoding")
+    if not windows:
+        return "cp1251"
 
+    # only non-ASCII bytes matter for all of the candidates
+    high = b"".join(data.translate(None, ASCII_BYTES) for data in windows)
 
-def _read_lines(it, lines, limit):
-    count = 0
-    eof = True
+    if not high:
+        return "cp1251"
+
+    # each window is decoded once for each candidate which is still valid
+    encodings = [encoding for encoding in CYRILLIC_ENCODINGS
+                 if _test_encoding(windows, encoding)]
 
-    for i, line in enumerate(it):
+    if not encodings:
         try:
-            line.decode("ascii")
-        except UnicodeDecodeError:
-            lines.append(line)
-        else:
-            if i == 0:
-                lines.append(line)
+            return _detect_encoding_general(windows)
+        except RuntimeError:
+            raise ValueError("cannot detect encoding")
 
-        count += 1
+    if len(encodings) == 1:
+        return encodings[0]
 
-        if i == limit:
-            eof = False
-            break
+    # a text in a single-byte encoding is almost never valid UTF-8
+    if "utf-8" in encodings:
+        return "utf-8"
 
-    return count, eof
+    return _choose_by_histogram(high, encodings)
 
 
-def _test_encoding(lines, encoding):
-    for line in lines:
+def _test_encoding(windows, encoding):
+    for data in windows:
         try:
-            line.decode(encoding)
+            data.decode(encoding)
         except UnicodeDecodeError:
             return False
 
     return True
 
 
-def _get_detector_encoding(lines, encodings=None):
-    detector = UniversalDetector()
-
-    for line in lines:
-        detector.feed(line)
-
-        best_encoding = None
-        best_confindence = 0
+def _choose_by_histogram(high, encodings):
+    # scores each encoding by frequencies of the letters its non-ASCII bytes
+    # stand for; uppercase letters are less frequent than lowercase ones in
+    # a text, pseudographics and other symbols are rare
 
-        for enc, conf in _get_detector_result(detector):
-            if encodings:
-                for _enc, status in encodings.items():
-                    if status and _enc == enc:
-                        if conf > best_confindence:
-                            best_encoding = enc
-                            best_confindence = conf
-            else:
-                if conf > best_confindence:
-                    best_encoding = enc
-                    best_confindence = conf
+    counts = [(bytes((i, )), high.count(i)) for i in range(128, 256)]
+    counts = [(b, n) for b, n in counts if n]
 
-        if best_confindence > 0.70:
-            detector.close()
+    letters = CYRILLIC_LETTERS_BY_FREQUENCY
+    weights = {c: len(letters) - i for i, c in enumerate(letters)}
+    weights.update({c.upper(): w / 4 for c, w in weights.items()})
 
-            try:
-                return normalize_encoding(best_encoding)
-            except ValueError:
-                raise RuntimeError("cannot detect file encoding")
+    best_encoding = None
+    best_score = None
 
-    return None
+    for encoding in encodings:
+        score = 0
 
+        for b, n in counts:
+            c = b.decode(encoding, errors="replace")
 
-def _get_detector_result(detector):
-    result = []
-
-    def _f(result, prober):
-        try:
-            probers = prober.probers
-        except AttributeError:
-            try:
-                encoding = normalize_encoding(prober.charset_name)
-            except ValueError:
-                pass
+            if c in weights:
+                score += n * weights[c]
+            elif "\u0400" <= c <= "\u04ff":
+                score += n
             else:
-                result.append((encoding, prober.get_confidence()))
-        else:
-            for x in probers:
-                _f(result, x)
+                score -= n * 8
 
-    for prober in detector._charset_probers:
-        _f(result, prober)
+        if best_score is None or score > best_score:
+            best_encoding = encoding
+            best_score = score
 
-    return result
+    return best_encoding
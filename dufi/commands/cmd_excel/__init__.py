@@ -2,8 +2,6 @@
 
 import re
 
-from .excellib.converter import ExcelConverter
-
 from ..base import Command, InvalidCommandArgs
 from ..arghelpers import process_files
 
@@ -104,6 +102,9 @@ Enable this option if your Excel sheets have a lot of empty lines in the end
                 if col:
                     max_len_custom[col] = 4000
 
+        # the readers of excel formats are imported only to convert files
+        from .excellib.converter import ExcelConverter
+
         convert_excel = ExcelConverter(
             callback=lambda row, _: row,
             sheet_mask=args.sheet.strip(),
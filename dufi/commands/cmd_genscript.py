@@ -1,16 +1,30 @@
 # [SublimeLinter @python:3]
 
 import os
-from itertools import zip_longest
 import re
-import win32console
 
 from .base import Command, InvalidCommandArgs
 from .sqlhelpers import sqlfmt, get_sql_name
-from .arghelpers import get_separator, get_files, process_files
+from .arghelpers import get_separator, get_files, echo_processing, \
+    type_positive_int
+from .parallel import get_jobs, get_pool
+from .profiler import ColumnProfile, profile_file, sample_file, \
+    TYPE_INT, TYPE_DECIMAL, TYPE_DATE, TYPE_DATETIME, SAMPLE_WINDOWS, \
+    SAMPLE_WINDOW_ROWS
+from .cache import FileCache
 from ..utils import echo
 
 
+def round_length(x):
+    if x > 1000:
+        return 4000
+    if x > 255:
+        return 1000
+    if x > 50:
+        return 255
+    return 50
+
+
 class GenerateScriptCommand(Command):
 
     cli_command = "create-script"
@@ -41,8 +55,6 @@ class GenerateScriptCommand(Command):
         regex_table = args.regex_table
 
         sep = bytes([get_separator(args)])
-        headers = {}
-        lengths = {}
 
         for file in files:
             file_name = os.path.basename(file)
@@ -52,69 +64,13 @@ class GenerateScriptCommand(Command):
                 raise ValueError("Cannot find table name: {}".format(file_name))
 
         base_dir = os.path.dirname(files[0])
-
-        def round_length(x):
-            if x > 1000:
-                return 4000
-            if x > 255:
-                return 1000
-            if x > 50:
-                return 255
-            return 50
-
-        for file in process_files(args):
-            file_size = os.path.getsize(file)
-            progress = None
-
-            with open(file, "rb") as fpi:
-                fpi_tell = fpi.tell
-
-                it = iter(fpi)
-                lns = []
-
-                if args.has_header:
-                    header = [x.decode("cp1251") for x in next(it).rstrip(b"\r\n").split(sep)]
-                    lns = [1] * len(header)
-                else:
-                    header = None
-
-                if args.fast_scan:
-                    it = (x for i, x in enumerate(it) if i < 1000)
-
-                for i, line in enumerate(it):
-                    new_lns = []
-
-                    for x, s in zip_longest(lns, line.rstrip(b"\r\n").split(sep)):
-                        if x is None:
-                            x = 1
-
-                        if s is None:
-                            s = ""
-
-                        new_lns.append(max(x, len(s)))
-
-                    lns = new_lns
-
-                    new_progess = 100 * fpi_tell() // file_size
-
-                    if new_progess != progress:
-                        echo("Progress: {}%".format(new_progess))
-                        progress = new_progess
-
-                if args.fast_scan:
-                    lns = [round_length(x) for x in lns]
-
-                headers[file] = header
-                lengths[file] = lns
-
-            if progress != 100:
-                echo("Progress: 100%")
+        profiles = cls._profile_files(files, args)
 
         query = []
         batch = ['set "SERVER=localhost"',
                  'set "DATABASE=my_database"']
 
-        for file, header in headers.items():
+        for file, (header, profile) in profiles.items():
             file_name = os.path.basename(file)
             table_name = re.sub(regex_fname, regex_table, os.path.basename(file))
 
@@ -133,19 +89,18 @@ class GenerateScriptCommand(Command):
 
             batch.append(bcp_cmd)
 
-            lns = lengths[file]
-
             if header is None:
-                header = ["Column {}".format(i + 1) for i in range(len(lns))]
+                header = ["Column {}".format(i + 1) for i in range(len(profile))]
 
             sql = ["IF OBJECT_ID({table.name.str}) IS NOT NULL",
                    "    DROP TABLE {table.name};",
                    "GO", "",
                    "CREATE TABLE {table.name} ("]
 
-            for i, (col_name, col_len) in enumerate(zip(header, lns)):
-                sql.append(sqlfmt("   " + ("," if i else " ") \
-                    + "{.name} nvarchar({.int})", col_name, col_len))
+            for i, col_name in enumerate(header[:len(profile)]):
+                sql.append(sqlfmt("   " + ("," if i else " ") + "{.name} ",
+                                  col_name)
+                           + cls._get_sql_type(profile, i, args.fast_scan))
 
             sql.append(");")
             sql.append("GO")
@@ -160,6 +115,8 @@ class GenerateScriptCommand(Command):
 
         batch_file = os.path.join(base_dir, "dufi_upload.bat")
 
+        import win32console
+
         cp = win32console.GetConsoleOutputCP()
 
         with open(batch_file, "w", encoding="cp{}".format(cp)) as fp:
@@ -170,6 +127,110 @@ class GenerateScriptCommand(Command):
             os.path.basename(batch_file),
             base_dir))
 
+    @classmethod
+    def _profile_files(cls, files, args):
+        # returns {file: (header, profile)} in the order of the files;
+        # profiles are cached, the other files are profiled by worker
+        # processes if --jobs is given
+
+        separator = get_separator(args)
+        cache_key = "profile:{}:{}:{}:{}".format(
+            separator, int(args.has_header), args.encoding,
+            int(args.detect_types))
+
+        # the fast scan profiles a sample of rows taken across the file
+        if args.fast_scan:
+            cache_key += ":sample:{}:{}".format(args.sample_windows,
+                                               args.time_limit)
+            scan_file = sample_file
+            scan_args = (separator, args.has_header, args.encoding,
+                         args.sample_windows, args.time_limit,
+                         args.detect_types)
+        else:
+            scan_file = profile_file
+            scan_args = (separator, args.has_header, args.encoding, None,
+                         args.detect_types)
+
+        profiles = {}
+        caches = {}
+
+        for file in files:
+            caches[file] = FileCache(file)
+            cached = caches[file].get(cache_key)
+
+            if cached is not None:
+                profiles[file] = cached[0], ColumnProfile.from_dict(cached[1])
+
+        pending = [file for file in files if file not in profiles]
+        jobs = min(get_jobs(args), len(pending))
+
+        if jobs > 1:
+            with get_pool(jobs) as pool:
+                futures = {file: pool.submit(scan_file, file, *scan_args,
+                                             show_progress=False)
+                           for file in pending}
+
+                for i, file in enumerate(files, 1):
+                    echo_processing(i, len(files), file)
+
+                    if file in futures:
+                        profiles[file] = futures[file].result()
+
+        else:
+            for i, file in enumerate(files, 1):
+                echo_processing(i, len(files), file)
+
+                if file not in profiles:
+                    profiles[file] = scan_file(file, *scan_args)
+
+        for file in pending:
+            header, profile = profiles[file]
+            caches[file].set(cache_key, [header, profile.to_dict()])
+
+        return {file: profiles[file] for file in files}
+
+    @classmethod
+    def _get_sql_type(cls, profile, i, fast_scan):
+        # types found by the fast scan are widened, the rest of the file can
+        # have larger numbers
+
+        value_type = profile.types[i]
+
+        if value_type == TYPE_INT:
+            digits = profile.int_digits[i]
+
+            if digits <= 9 and not fast_scan:
+                return "int"
+
+            if digits <= 18:
+                return "bigint"
+
+            if digits <= 38:
+                return "numeric({}, 0)".format(digits)
+
+        elif value_type == TYPE_DECIMAL:
+            scale = profile.scales[i]
+            precision = profile.int_digits[i] + scale
+
+            if fast_scan and scale < 38:
+                precision = 38
+
+            if precision <= 38:
+                return "numeric({}, {})".format(max(precision, 1), scale)
+
+        elif value_type == TYPE_DATE:
+            return "date"
+
+        elif value_type == TYPE_DATETIME:
+            return "datetime2"
+
+        length = profile.lengths[i]
+
+        if fast_scan:
+            length = round_length(length)
+
+        return "nvarchar({})".format(length)
+
     ############################################################################
 
     @classmethod
@@ -195,9 +256,38 @@ class GenerateScriptCommand(Command):
         parser.add_argument(
             "-f", "--fast-scan",
             action="store_true",
-            help=("scan only the first 1000 rows (all lengths will be round up "
-                  "with 50, 255, 1000, 4000)"),
+            help=("scan only a sample of rows taken by windows evenly spaced "
+                  "across the file (all lengths will be round up with 50, "
+                  "255, 1000, 4000)"),
+        )
+        parser.add_argument(
+            "-w", "--sample-windows",
+            type=type_positive_int,
+            default=SAMPLE_WINDOWS,
+            metavar="N",
+            help=("number of windows of {} rows for `--fast-scan` (default: "
+                  "{})".format(SAMPLE_WINDOW_ROWS, SAMPLE_WINDOWS)),
+        )
+        parser.add_argument(
+            "-L", "--time-limit",
+            type=float,
+            metavar="SECONDS",
+            help=("stop sampling a file after the time limit; the windows "
+                  "read by then are still spread across the file"),
+        )
+        parser.add_argument(
+            "-t", "--detect-types",
+            action="store_true",
+            help=("use int, bigint, numeric, date and datetime2 types for "
+                  "columns of numbers and ISO dates instead of nvarchar"),
+        )
+        parser.add_argument(
+            "-c", "--encoding",
+            default="cp1251",
+            metavar="ENCODING",
+            help="encoding of the headers (default: cp1251)",
         )
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -3,6 +3,7 @@
 from .base import Command
 from .iconv import iconv
 from .arghelpers import GUIOpt, type_single_byte, get_separator
+from .parallel import get_jobs
 
 
 class IconvCommand(Command):
@@ -17,7 +18,8 @@ class IconvCommand(Command):
     @classmethod
     def run(cls, args):
         return iconv(args.from_code, args.to_code, args.inputfile, args.output,
-                     get_separator(args) if args.convert_format else None)
+                     get_separator(args) if args.convert_format else None,
+                     jobs=get_jobs(args))
 
     ############################################################################
 
@@ -43,6 +45,7 @@ class IconvCommand(Command):
             default=",",
             help="character that separates fields in a row (default: ',')",
         )
+        cls._add_jobs_arguments(parser)
         parser.add_argument(
             "inputfile",
             nargs="?",
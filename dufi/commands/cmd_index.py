@@ -0,0 +1,62 @@
+# [SublimeLinter @python:3]
+
+from .base import Command
+from .arghelpers import get_separator, process_files
+from .parallel import get_jobs
+from .index import build_index, load_index, get_index_file
+from ..utils import echo
+
+
+class IndexCommand(Command):
+
+    cli_command = "index"
+    cli_command_aliases = ("idx", )
+    cli_command_help = ("build an index of line offsets (*.dufiindex) for "
+                        "random access to rows")
+
+    ############################################################################
+
+    @classmethod
+    def run(cls, args):
+        jobs = get_jobs(args)
+
+        if args.count_separators:
+            separator = get_separator(args)
+            qualifier = b'"'[0] if args.with_qualifier else -1
+        else:
+            separator = -1
+            qualifier = -1
+
+        for file in process_files(args):
+            index_file = get_index_file(file)
+
+            if not args.force:
+                index = load_index(file, separator, qualifier)
+
+                if index is not None:
+                    echo("Index is up to date: {} lines".format(len(index)))
+                    continue
+
+            index = build_index(file, separator, qualifier, jobs)
+            index.save(index_file)
+
+            echo("Lines: {}".format(len(index)))
+            echo("Index saved: {}".format(index_file))
+
+    ############################################################################
+
+    @classmethod
+    def _add_arguments(cls, parser):
+        cls._add_csv_arguments(parser)
+        parser.add_argument(
+            "-c", "--count-separators",
+            action="store_true",
+            help="save the number of separators of each row into the index",
+        )
+        parser.add_argument(
+            "-f", "--force",
+            action="store_true",
+            help="rebuild the index even if it is up to date",
+        )
+        cls._add_jobs_arguments(parser)
+        cls._add_files_arguments(parser)
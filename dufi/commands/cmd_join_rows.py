@@ -4,8 +4,13 @@ import os
 import re
 
 from .base import Command, InvalidCommandArgs
-from .arghelpers import process_files, format_file_path
-from ..utils import echo
+from .arghelpers import process_files, format_file_path, get_files, \
+    echo_processing
+from .parallel import get_jobs, get_pool
+from .progress import Progress
+
+
+JOIN_BLOCK_SIZE = 4 * 1024 * 1024
 
 
 class JoinRowsCommand(Command):
@@ -31,84 +36,25 @@ class JoinRowsCommand(Command):
         if isinstance(pattern, str):
             pattern = pattern.encode("cp1251")
 
-        if args.regex:
-            join_rows = cls._join_rows_regex
-        else:
-            join_rows = cls._join_rows_plain
-
-        for file in process_files(args):
-            file_out = format_file_path("!\\!_NEW.!", file)
-            file_size = os.path.getsize(file)
-
-            with open(file, "rb") as fpi, open(file_out, "wb") as fpo:
-                join_rows(fpi, fpo, pattern, args.negative, file_size)
-
-    @staticmethod
-    def _join_rows_plain(fpi, fpo, pattern, negative, file_size):
-        fpo_write = fpo.write
-        fpi_tell = fpi.tell
-
-        fpi_it = iter(fpi)
-        fpo_write(next(fpi_it).rstrip(b"\r\n"))
-
-        progress = None
-
-        for line in fpi_it:
-            match = line.startswith(pattern)
-
-            if negative:
-                match = not match
-
-            if match:
-                fpo_write(line[len(pattern):].rstrip(b"\r\n"))
-            else:
-                fpo_write(b"\r\n")
-                fpo_write(line.rstrip(b"\r\n"))
-
-            new_progess = 100 * fpi_tell() // file_size
-
-            if new_progess != progress:
-                echo("Progress: {}%".format(new_progess))
-                progress = new_progess
-
-        fpo_write(b"\r\n")
+        files = get_files(args)
+        jobs = min(get_jobs(args), len(files))
 
-        if progress != 100:
-            echo("Progress: 100%")
+        if jobs > 1:
+            # the files are processed by worker processes; the messages are
+            # printed in the order of the files
+            with get_pool(jobs) as pool:
+                futures = [pool.submit(join_rows_file, file, pattern,
+                                       args.regex, args.negative, False)
+                           for file in files]
 
-    @staticmethod
-    def _join_rows_regex(fpi, fpo, pattern, negative, file_size):
-        fpo_write = fpo.write
-        fpi_tell = fpi.tell
+                for i, (file, future) in enumerate(zip(files, futures), 1):
+                    echo_processing(i, len(files), file)
+                    future.result()
 
-        re_match = re.compile(b"^" + pattern).match
+            return
 
-        fpi_it = iter(fpi)
-        fpo_write(next(fpi_it).rstrip(b"\r\n"))
-
-        progress = None
-
-        for line in fpi_it:
-            match = re_match(line)
-
-            if negative:
-                match = not match
-
-            if not match:
-                fpo_write(b"\r\n")
-
-            fpo_write(line.rstrip(b"\r\n"))
-
-            new_progess = 100 * fpi_tell() // file_size
-
-            if new_progess != progress:
-                echo("Progress: {}%".format(new_progess))
-                progress = new_progess
-
-        fpo_write(b"\r\n")
-
-        if progress != 100:
-            echo("Progress: 100%")
+        for file in process_files(args):
+            join_rows_file(file, pattern, args.regex, args.negative)
 
     ############################################################################
 
@@ -130,6 +76,7 @@ class JoinRowsCommand(Command):
             action="store_true",
             help="concat lines which do not match the pattern",
         )
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -155,3 +102,122 @@ class JoinRowsCommand(Command):
             args.append("--negative")
 
         return args
+
+
+def join_rows_file(file, pattern, regex, negative, show_progress=True):
+    file_out = format_file_path("!\\!_NEW.!", file)
+    file_size = os.path.getsize(file)
+    progress = Progress(file_size) if show_progress else None
+
+    with open(file, "rb") as fpi, open(file_out, "wb") as fpo:
+        # the first line is never joined
+        line = fpi.readline()
+
+        if not line:
+            return
+
+        fpo.write(line.rstrip(b"\r\n"))
+
+        if regex or negative or b"\r" in pattern or b"\n" in pattern:
+            join_block = _get_line_joiner(pattern, regex, negative)
+        else:
+            join_block = _get_replace_joiner(pattern)
+
+        pos = len(line)
+        tail = b""
+
+        while True:
+            # a line longer than a block is read with a growing buffer
+            data = fpi.read(max(JOIN_BLOCK_SIZE, len(tail)))
+
+            if not data:
+                if tail:
+                    fpo.write(join_block(tail, len(tail)))
+
+                break
+
+            buf = tail + data if tail else data
+            stop = buf.rfind(b"\n") + 1
+
+            if stop == 0:
+                tail = buf
+                continue
+
+            tail = buf[stop:]
+            fpo.write(join_block(buf, stop))
+
+            pos += len(data)
+
+            if progress is not None:
+                progress.update(pos)
+
+        fpo.write(b"\r\n")
+
+    if progress is not None:
+        progress.finish(file_size)
+
+
+def _get_replace_joiner(pattern):
+    # the lines of a block are written with b"\n" before each of them; the
+    # lines which start with the pattern are joined by removing b"\n" along
+    # with the pattern, the other ones get CR+LF
+
+    join_mark = b"\n" + pattern
+
+    def join_block(buf, stop):
+        if buf[stop-1] == 10:
+            stop -= 1
+
+        text = (b"\n" + buf[:stop]).rstrip(b"\r")
+
+        # a line may end with several CR characters
+        while b"\r\n" in text:
+            text = text.replace(b"\r\n", b"\n")
+
+        return text.replace(join_mark, b"").replace(b"\n", b"\r\n")
+
+    return join_block
+
+
+def _get_line_joiner(pattern, regex, negative):
+    # lines are tested right in the buffer; the regex is matched with
+    # re.MULTILINE, so '^' and '$' behave as for a separate line
+
+    if regex:
+        re_match = re.compile(b"^" + pattern, re.MULTILINE).match
+        skip = 0
+    else:
+        startswith = bytes.startswith
+        skip = len(pattern)
+
+    def join_block(buf, stop):
+        parts = []
+        parts_append = parts.append
+        buf_find = buf.find
+        pos = 0
+
+        while pos < stop:
+            end = buf_find(b"\n", pos, stop) + 1
+
+            if end == 0:
+                end = stop
+
+            if regex:
+                match = re_match(buf, pos, end)
+            else:
+                match = startswith(buf, pattern, pos, end)
+
+            if negative:
+                match = not match
+
+            if match:
+                parts_append(buf[pos+skip:end].rstrip(b"\r\n"))
+            else:
+                parts_append(b"\r\n")
+                parts_append(buf[pos:end].rstrip(b"\r\n"))
+
+            pos = end
+
+        return b"".join(parts)
+
+    return join_block
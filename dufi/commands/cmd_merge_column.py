@@ -4,7 +4,8 @@ import os
 
 from .base import Command, InvalidCommandArgs
 from .cdufi import merge_columns
-from .patch import patch
+from .patch import patch, open_patch_output, check_patch_args, \
+    PatchError
 from .arghelpers import type_single_byte, get_separator, process_files
 
 
@@ -38,12 +39,18 @@ for this command; use the Repair command instead
         for file in process_files(args):
             patch_file = file + ".patch"
 
-            with open(file, "rb") as fpi, open(patch_file, "w") as fpo:
-                merge_columns(
-                    fpi, fpo, os.path.getsize(file), get_separator(args),
-                    args.column, args.replacement, -1)
+            # an in-place patch which cannot be applied aborts the command
+            try:
+                with open(file, "rb") as fpi, \
+                        open_patch_output(file, patch_file, args) as fpo:
+                    merge_columns(
+                        fpi, fpo, os.path.getsize(file), get_separator(args),
+                        args.column, args.replacement, -1)
+            except PatchError:
+                return 1
 
-            patch(file, patch_file)
+            if not args.in_place_stream:
+                patch(file, patch_file)
 
     ############################################################################
 
@@ -64,8 +71,13 @@ for this command; use the Repair command instead
             metavar="CHAR",
             help="separator replacement (default: #)",
         )
+        cls._add_patch_arguments(parser)
         cls._add_files_arguments(parser)
 
+    @classmethod
+    def check_args(cls, args):
+        return check_patch_args(args)
+
     ############################################################################
 
     @classmethod
@@ -5,12 +5,22 @@ import codecs
 from pathlib import Path
 import re
 import csv
+import shutil
+import tempfile
+from itertools import islice
+from operator import itemgetter
 
 from .base import Command, InvalidCommandArgs
-from .arghelpers import GUIOpt, get_separator, get_files, process_files
+from .arghelpers import GUIOpt, get_separator, get_files, process_files, \
+    echo_processing, echo_warning
+from .parallel import get_jobs, get_pool
+from .progress import Progress, PROGRESS_ROWS
 from ..utils import echo
 
 
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+
 class MergeCSVCommand(Command):
 
     cli_command = "union-csv"
@@ -70,12 +80,13 @@ class MergeCSVCommand(Command):
             "quotechar": '"' if args.with_qualifier else None,
         }
 
-        field_names = []
+        # headers are read once; a dict keeps the order of the columns and
+        # finds known names without a linear search
+        headers = {}
+        field_names = {}
 
         for file in get_files(args):
-            file = Path(file)
-
-            if file == file_out:
+            if Path(file) == file_out:
                 echo("ERROR: input and output files must be different")
                 return 1
 
@@ -83,54 +94,75 @@ class MergeCSVCommand(Command):
                 try:
                     header_row = next(iter(csv.reader(fpi, **csv_kargs)))
                 except StopIteration:
-                    echo("WARNING: empty CSV file: {}".format(file))
+                    echo_warning("empty CSV file: {}".format(file))
                     continue
 
-            for name in cls._get_header(header_row):
-                if name not in field_names:
-                    field_names.append(name)
+            headers[file] = cls._get_header(header_row)
+
+            for name in headers[file]:
+                field_names.setdefault(name, len(field_names))
 
         if not field_names:
             echo("ERROR: cannot collect field names")
             return 1
 
+        field_names = list(field_names)
+
         os.makedirs(file_out.parent, exist_ok=True)
 
         with open(file_out, "w", encoding=args.encoding, newline="") as fpo:
-            csv_writer = csv.writer(fpo, **csv_kargs)
+            csv.writer(fpo, **csv_kargs).writerow(field_names)
 
-            csv_writerow = csv_writer.writerow
-            csv_writerow(field_names)
+        jobs = min(get_jobs(args), len(headers))
 
-            for file in process_files(args):
-                file_size = os.path.getsize(file)
-                progress = None
+        # segments are concatenated as bytes, so the encoding must not emit
+        # BOM at the beginning of each of them
+        if jobs > 1 and not "".encode(args.encoding):
+            cls._union_parallel(file_out, get_files(args), headers,
+                                field_names, csv_kargs, args.encoding, jobs)
+            return 0
 
-                with open(file, "r", encoding=args.encoding, newline="") as fpi:
-                    fpi_tell = fpi.buffer.tell
+        with open(file_out, "a", encoding=args.encoding, newline="") as fpo:
+            for file in process_files(args):
+                if file in headers:
+                    union_file(fpo, file, headers[file], field_names,
+                               csv_kargs, args.encoding)
 
-                    csv_reader = csv.reader(fpi, **csv_kargs)
-                    csv_reader_iter = iter(csv_reader)
+        return 0
 
-                    try:
-                        header = cls._get_header(next(csv_reader_iter))
-                    except StopIteration:
+    @classmethod
+    def _union_parallel(cls, file_out, files, headers, field_names,
+                        csv_kargs, encoding, jobs):
+        # each file is copied into a temporary segment by a worker process;
+        # the segments are appended to the output in the order of the files;
+        # the files are numbered as in the given list, the empty ones too
+
+        with tempfile.TemporaryDirectory(dir=file_out.parent) as tmp_dir, \
+                get_pool(jobs) as pool:
+            futures = {}
+
+            for i, file in enumerate(files):
+                if file in headers:
+                    segment = os.path.join(tmp_dir, "{}.part".format(i))
+                    futures[i] = pool.submit(
+                        union_file_into, segment, file, headers[file],
+                        field_names, csv_kargs, encoding)
+
+            with open(file_out, "ab") as fpo:
+                for i, file in enumerate(files):
+                    echo_processing(i + 1, len(files), file)
+
+                    if i not in futures:
                         continue
 
-                    for row in csv_reader_iter:
-                        d = dict(zip(header, row))
-                        csv_writerow([d.get(name, "") for name in field_names])
-
-                        new_progess = 100 * fpi_tell() // file_size
+                    futures[i].result()
 
-                        if new_progess != progress:
-                            echo("Progress: {}%".format(new_progess))
-                            progress = new_progess
+                    segment = os.path.join(tmp_dir, "{}.part".format(i))
 
-                if progress != 100:
-                    echo("Progress: 100%")
+                    with open(segment, "rb") as fpi:
+                        shutil.copyfileobj(fpi, fpo, COPY_BUFFER_SIZE)
 
-        return 0
+                    os.remove(segment)
 
     @classmethod
     def _get_header(cls, row):
@@ -180,6 +212,7 @@ class MergeCSVCommand(Command):
                                "initialfile": "output.csv"})
         )
 
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -228,3 +261,70 @@ class MergeCSVCommand(Command):
     def _extract_encoding(s):
         m = re.match(r"^([^()]+)( \(.*\))?$", s)
         return m.group(1).strip().lower().replace("_", "-").replace(" ", "-")
+
+
+def _get_gather(header, field_names):
+    # returns a function which takes a row of a file with the header and
+    # returns the values of field_names in their order; missing values are
+    # taken from the empty string appended to the row
+
+    width = len(header)
+    index = {name: i for i, name in enumerate(header)}
+    getter = itemgetter(*[index.get(name, width) for name in field_names])
+    padding = [""] * (width + 1)
+
+    def gather(row):
+        if len(row) == width:
+            row.append("")
+        else:
+            # values without a column name are dropped, missing values are
+            # empty
+            row = row[:width]
+            row += padding[len(row):]
+
+        return getter(row)
+
+    def gather_single(row):
+        return (gather(row), )
+
+    # itemgetter with a single item returns the value itself
+    return gather_single if len(field_names) == 1 else gather
+
+
+def union_file(fpo, file, header, field_names, csv_kargs, encoding,
+               show_progress=True):
+    csv_writerows = csv.writer(fpo, **csv_kargs).writerows
+    gather = _get_gather(header, field_names)
+
+    progress = Progress(os.path.getsize(file)) if show_progress else None
+    n = 0
+
+    with open(file, "r", encoding=encoding, newline="") as fpi:
+        fpi_tell = fpi.buffer.tell
+
+        csv_reader_iter = iter(csv.reader(fpi, **csv_kargs))
+        next(csv_reader_iter, None)
+
+        while True:
+            rows = list(islice(csv_reader_iter, PROGRESS_ROWS))
+
+            if not rows:
+                break
+
+            csv_writerows(map(gather, rows))
+            n += len(rows)
+
+            if progress is not None:
+                progress.update(fpi_tell(), n)
+
+    if progress is not None:
+        progress.finish(rows=n)
+
+
+def union_file_into(output, file, header, field_names, csv_kargs, encoding):
+    # progress of worker processes is not shown, the main process reports
+    # finished files
+
+    with open(output, "w", encoding=encoding, newline="") as fpo:
+        union_file(fpo, file, header, field_names, csv_kargs, encoding,
+                   show_progress=False)
@@ -1,12 +1,38 @@
 # [SublimeLinter @python:3]
 
 import os
+from collections import Counter
 
 from .base import Command
-from .arghelpers import process_files
+from .arghelpers import get_files, echo_processing, echo_warning
+from .parallel import get_jobs, get_pool
+from .progress import Progress
 from ..utils import echo
 
 
+FIX_BLOCK_SIZE = 4 * 1024 * 1024
+
+# the wrap width is detected by lengths of the lines of blocks taken from
+# the beginning, the middle and the end of the file; the most frequent
+# length must be the maximal one and must have at least WIDTH_MIN_SHARE of
+# the non-empty lines
+WIDTH_SAMPLE_SIZE = 1024 * 1024
+WIDTH_SAMPLES = 3
+WIDTH_MIN_SHARE = 0.1
+
+
+def type_width(s):
+    if s == "auto":
+        return s
+
+    width = int(s)
+
+    if width < 1:
+        raise ValueError(s)
+
+    return width
+
+
 class OracleFixCommand(Command):
 
     cli_command = "oracle-fix"
@@ -23,37 +49,63 @@ class OracleFixCommand(Command):
 
     @classmethod
     def run(cls, args):
-        for file in process_files(args):
-            fname_base, fname_ext = os.path.splitext(file)
+        files = get_files(args)
+        files_to_fix = [file for file in files if not _is_fixed(file)]
+        jobs = min(get_jobs(args), len(files_to_fix))
 
-            if fname_base.upper().endswith("_FIXED"):
-                echo("WARNING: file already fixed, skipped")
-                continue
+        if jobs > 1:
+            with get_pool(jobs) as pool:
+                futures = {file: pool.submit(oracle_fix_file, file,
+                                             args.width, False)
+                           for file in files_to_fix}
+                cls._fix_files(files, args.width, futures)
 
-            fname_fixed = "{}_FIXED{}".format(fname_base, fname_ext)
-            file_size = os.path.getsize(file)
+            return
 
-            progress = None
+        cls._fix_files(files, args.width)
 
-            with open(file, "rb") as fpi, open(fname_fixed, "wb") as fpo:
-                fpi_tell = fpi.tell
+    @classmethod
+    def _fix_files(cls, files, width, futures=None):
+        # files are numbered as in the list given and the messages are
+        # printed in its order; results of worker processes are taken from
+        # futures if any
 
-                for line in fpi:
-                    fpo.write(line.rstrip(b"\r\n") or b"\r\n")
+        for i, file in enumerate(files, 1):
+            echo_processing(i, len(files), file)
 
-                    new_progess = 100 * fpi_tell() // file_size
+            if _is_fixed(file):
+                echo_warning("file already fixed, skipped: {}".format(file))
+            elif futures is not None:
+                cls._echo_width(width, futures[file].result())
+            else:
+                cls._echo_width(width, oracle_fix_file(file, width))
 
-                    if new_progess != progress:
-                        echo("Progress: {}%".format(new_progess))
-                        progress = new_progess
+    @staticmethod
+    def _echo_width(requested_width, width):
+        if requested_width != "auto":
+            return
 
-        if progress != 100:
-            echo("Progress: 100%")
+        if width is None:
+            echo_warning("cannot detect the wrap width; lines are joined "
+                         "till an empty line")
+        else:
+            echo("Wrap width: {}".format(width))
 
     ############################################################################
 
     @classmethod
     def _add_arguments(cls, parser):
+        parser.add_argument(
+            "-w", "--width",
+            type=type_width,
+            metavar="auto|N",
+            help=("lines are wrapped each N characters: a line of N "
+                  "characters is joined with the next one, a shorter line "
+                  "ends the row and empty lines between rows are dropped; "
+                  "'auto' detects N by lengths of the lines (by default, "
+                  "all lines are joined till an empty line)"),
+        )
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
     ############################################################################
@@ -67,3 +119,158 @@ class OracleFixCommand(Command):
     @classmethod
     def _get_cmd_args(cls, var):
         return []
+
+
+def _is_fixed(file):
+    return os.path.splitext(file)[0].upper().endswith("_FIXED")
+
+
+def oracle_fix_file(file, width=None, show_progress=True):
+    # returns the wrap width used or None if all lines are joined till an
+    # empty line
+
+    fname_base, fname_ext = os.path.splitext(file)
+    fname_fixed = "{}_FIXED{}".format(fname_base, fname_ext)
+
+    if width == "auto":
+        width = detect_wrap_width(file)
+
+    progress = Progress(os.path.getsize(file)) if show_progress else None
+
+    with open(file, "rb") as fpi, open(fname_fixed, "wb") as fpo:
+        if width is None:
+            _join_till_empty_line(fpi, fpo, progress)
+        else:
+            _join_wrapped_lines(fpi, fpo, width, progress)
+
+    if progress is not None:
+        progress.finish()
+
+    return width
+
+
+def _iter_line_blocks(fpi, progress):
+    # yields lists of lines of the file without their EOL (CR characters at
+    # the end of a line are dropped as well)
+
+    pos = 0
+    tail = b""
+
+    while True:
+        # a line longer than a block is read with a growing buffer
+        data = fpi.read(max(FIX_BLOCK_SIZE, len(tail)))
+
+        if not data:
+            if tail:
+                yield [tail.rstrip(b"\r")]
+
+            break
+
+        buf = tail + data if tail else data
+        stop = buf.rfind(b"\n")
+
+        if stop < 0:
+            tail = buf
+            continue
+
+        tail = buf[stop+1:]
+        text = buf[:stop]
+
+        while b"\r\n" in text:
+            text = text.replace(b"\r\n", b"\n")
+
+        lines = text.split(b"\n")
+        lines[-1] = lines[-1].rstrip(b"\r")
+
+        yield lines
+
+        pos += len(data)
+
+        if progress is not None:
+            progress.update(pos)
+
+
+def _join_till_empty_line(fpi, fpo, progress):
+    # lines are joined, an empty line is replaced by CR+LF
+
+    crlf = b"\r\n"
+
+    for lines in _iter_line_blocks(fpi, progress):
+        fpo.write(b"".join([line or crlf for line in lines]))
+
+
+def _join_wrapped_lines(fpi, fpo, width, progress):
+    # a line of the width is a part of a row which continues on the next
+    # line; an empty line after it ends the row (its length is a multiple of
+    # the width), otherwise empty lines are record separators
+
+    crlf = b"\r\n"
+    wrapped = False
+
+    for lines in _iter_line_blocks(fpi, progress):
+        parts = []
+        parts_append = parts.append
+
+        for line in lines:
+            n = len(line)
+
+            if n == width:
+                parts_append(line)
+                wrapped = True
+
+            elif n:
+                parts_append(line)
+                parts_append(crlf)
+                wrapped = False
+
+            elif wrapped:
+                parts_append(crlf)
+                wrapped = False
+
+        fpo.write(b"".join(parts))
+
+    if wrapped:
+        fpo.write(crlf)
+
+
+def detect_wrap_width(file):
+    # returns the detected width or None
+
+    lengths = Counter()
+
+    with open(file, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+
+        if size <= WIDTH_SAMPLE_SIZE * WIDTH_SAMPLES:
+            offsets = [0]
+            sample_size = size
+        else:
+            offsets = [(size - WIDTH_SAMPLE_SIZE) * i // (WIDTH_SAMPLES - 1)
+                       for i in range(WIDTH_SAMPLES)]
+            sample_size = WIDTH_SAMPLE_SIZE
+
+        for offset in offsets:
+            fp.seek(offset)
+            lines = fp.read(sample_size).split(b"\n")
+
+            # the first and the last lines of a sample may be incomplete
+            if offset > 0:
+                lines = lines[1:]
+
+            if offset + sample_size < size:
+                lines = lines[:-1]
+
+            lengths.update(len(line.rstrip(b"\r")) for line in lines)
+
+    del lengths[0]
+
+    if not lengths:
+        return None
+
+    width, count = lengths.most_common(1)[0]
+
+    if width != max(lengths) \
+            or count < sum(lengths.values()) * WIDTH_MIN_SHARE:
+        return None
+
+    return width
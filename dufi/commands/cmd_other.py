@@ -1,8 +1,7 @@
 # [SublimeLinter @python:3]
 
-import sys
-
 from .base import dufi_commands, Command, InvalidCommandArgs
+from ..utils import get_exe_args
 
 
 class OtherCommand(Command):
@@ -50,10 +49,7 @@ class OtherCommand(Command):
 
     @classmethod
     def get_cmd_args(cls, app):
-        args = [sys.executable, ]
-
-        if not getattr(sys, "frozen", False):
-            args.append(sys.argv[0])
+        args = get_exe_args()
 
         command = app.var.other_command
         dufcmd = dufi_commands.get_by_name_cli(command)
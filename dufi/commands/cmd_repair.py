@@ -1,11 +1,19 @@
 # [SublimeLinter @python:3]
 
 import os
+import tempfile
+from bisect import bisect_left
+from concurrent.futures import as_completed
 
 from .base import Command
-from .cdufi import concat_lines, repair_csv
-from .patch import patch
+from .cdufi import concat_lines, repair_csv, repair_csv_range
+from .patch import patch, open_patch_output, read_patch, \
+    check_patch_args, PatchError
 from .arghelpers import process_files, get_separator
+from .parallel import get_jobs, get_pool, split_file
+from .progress import Progress
+from .report import get_report_file, read_report
+from ..utils import echo
 
 
 class RepairCommand(Command):
@@ -30,29 +38,146 @@ class RepairCommand(Command):
 
     @classmethod
     def run(cls, args):
-        for file in process_files(args):
-            cls._repair_csv(file, args)
+        # an in-place patch which cannot be applied aborts the command
+        try:
+            for file in process_files(args):
+                cls._repair_csv(file, args)
+        except PatchError:
+            return 1
 
-    @staticmethod
-    def _repair_csv(file, args):
+    @classmethod
+    def _repair_csv(cls, file, args):
         patch_file = file + ".patch"
         file_size = os.path.getsize(file)
 
         if not args.with_qualifier:
-            with open(file, "rb") as fpi, open(patch_file, "w") as fpo:
+            if cls._has_no_rows_to_join(file, get_separator(args)):
+                echo("The report has no rows to join, nothing to repair")
+                return
+
+            with open(file, "rb") as fpi, \
+                    open_patch_output(file, patch_file, args) as fpo:
                 concat_lines(fpi, fpo, file_size, get_separator(args), -1)
 
-            patch(file, patch_file)
+            if not args.in_place_stream:
+                patch(file, patch_file)
+
             return
 
-        with open(file, "rb") as fpi, open(patch_file, "w") as fpo:
-            count = repair_csv(
-                fpi, fpo, file_size, get_separator(args), b'"'[0], b"'"[0],
-                args.doubled_qualifier, args.remove_embedded_newlines)
+        jobs = get_jobs(args)
+        ranges = split_file(file, jobs) if jobs > 1 else [(0, file_size)]
 
-        if count > 0:
+        if len(ranges) > 1:
+            with open_patch_output(file, patch_file, args) as fpo:
+                count = cls._repair_csv_parallel(file, fpo, ranges, args, jobs)
+
+        else:
+            with open(file, "rb") as fpi, \
+                    open_patch_output(file, patch_file, args) as fpo:
+                count = repair_csv(
+                    fpi, fpo, file_size, get_separator(args), b'"'[0], b"'"[0],
+                    args.doubled_qualifier, args.remove_embedded_newlines)
+
+        if count > 0 and not args.in_place_stream:
             patch(file, patch_file)
 
+    @staticmethod
+    def _has_no_rows_to_join(file, separator):
+        # lines are joined only if they have too few separators, so there is
+        # nothing to do if csv-check has found no such rows in the current
+        # content of the file
+
+        try:
+            report = read_report(get_report_file(file))
+        except (OSError, ValueError):
+            return False
+
+        # rows without separators are joined as well, so the expected
+        # number must not be 0
+        if report.rows is None or report.expected_count <= 0 \
+                or not report.is_valid_for(file, separator, -1):
+            return False
+
+        return all(count > report.expected_count
+                   for _, _, count, _ in report.ranges)
+
+    @classmethod
+    def _repair_csv_parallel(cls, file, fpo, ranges, args, jobs):
+        # with --remove-embedded-newlines a quoted value can span several
+        # lines, so it is not known whether a range starts inside of quotes;
+        # such ranges are repaired both ways and the right variant is chosen
+        # afterwards range by range, following the quoted state from the
+        # beginning of the file
+
+        speculate = args.remove_embedded_newlines
+        tmp_dir_base = os.path.dirname(os.path.abspath(file))
+
+        progress = Progress(os.path.getsize(file))
+        done = 0
+
+        with tempfile.TemporaryDirectory(dir=tmp_dir_base) as tmp_dir, \
+                get_pool(jobs) as pool:
+            futures = {}
+
+            for i, (start, stop) in enumerate(ranges):
+                patch_file = os.path.join(tmp_dir, "{}.patch".format(i))
+
+                if speculate:
+                    spec_patch_file = os.path.join(
+                        tmp_dir, "{}_quoted.patch".format(i))
+                else:
+                    spec_patch_file = None
+
+                future = pool.submit(
+                    repair_csv_range, file, patch_file, spec_patch_file,
+                    start, stop, get_separator(args), b'"'[0], b"'"[0],
+                    args.doubled_qualifier, args.remove_embedded_newlines)
+                futures[future] = (patch_file, spec_patch_file, stop - start)
+
+            for future in as_completed(futures):
+                done += futures[future][2]
+                progress.update(done)
+
+            progress.finish(done)
+
+            count = 0
+            quoted = False
+
+            for future, (patch_file, spec_patch_file, _) in futures.items():
+                (range_count, range_quoted), \
+                    (spec_count, spec_quoted, merge_offset, count_before_merge) \
+                    = future.result()
+
+                if not quoted:
+                    cls._copy_patch(patch_file, fpo)
+                    count += range_count
+                    quoted = range_quoted
+
+                elif merge_offset is None:
+                    cls._copy_patch(spec_patch_file, fpo)
+                    count += spec_count
+                    quoted = spec_quoted
+
+                else:
+                    cls._copy_patch(spec_patch_file, fpo)
+                    cls._copy_patch(patch_file, fpo, merge_offset)
+                    count += spec_count + range_count - count_before_merge
+                    quoted = range_quoted
+
+        return count
+
+    @staticmethod
+    def _copy_patch(patch_file, fpo, from_offset=None):
+        offsets, expected_codes, replace_codes = read_patch(patch_file)
+
+        if from_offset is not None:
+            i = bisect_left(offsets, from_offset)
+            offsets = offsets[i:]
+            expected_codes = expected_codes[i:]
+            replace_codes = replace_codes[i:]
+
+        fpo.extend(offsets, expected_codes, replace_codes)
+
     ############################################################################
 
     @classmethod
@@ -70,8 +195,14 @@ class RepairCommand(Command):
             help=("remove newlines embedded into text fields "
                   "(--with-qualifier must be set)",)
         )
+        cls._add_patch_arguments(parser)
+        cls._add_jobs_arguments(parser)
         cls._add_files_arguments(parser)
 
+    @classmethod
+    def check_args(cls, args):
+        return check_patch_args(args)
+
     ############################################################################
 
     @classmethod
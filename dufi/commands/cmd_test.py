@@ -4,7 +4,8 @@ import time
 import argparse
 
 from .base import Command
-from ..utils import echo
+from .arghelpers import echo_processing
+from .progress import Progress
 
 
 class TestCommand(Command):
@@ -18,28 +19,36 @@ class TestCommand(Command):
 
     @classmethod
     def run(cls, args):
-        echo("Processing 1/3: a.txt")
+        # the progress goes through Progress to be sent as events as well
+        echo_processing(1, 3, "a.txt")
+        progress = Progress(100)
 
         for i in range(101):
-            echo("Progress: {}%".format(i))
+            progress.update(i)
             time.sleep(0.05)
 
-        echo("Processing 2/3: b.txt")
+        progress.finish()
+
+        echo_processing(2, 3, "b.txt")
+        progress = Progress(100)
 
         for i in range(101):
-            echo("Progress: {}%".format(i))
+            progress.update(i)
 
             if i == 50:
                 raise RuntimeError("atata")
 
             time.sleep(0.01)
 
-        echo("Processing 3/3: c.txt")
+        echo_processing(3, 3, "c.txt")
+        progress = Progress(100)
 
         for i in range(101):
-            echo("Progress: {}%".format(i))
+            progress.update(i)
             time.sleep(0.01)
 
+        progress.finish()
+
     ############################################################################
 
     @classmethod
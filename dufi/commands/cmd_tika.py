@@ -4,17 +4,11 @@ import os
 import logging
 import shutil
 import tempfile
-import psutil
-
-import tika.tika
-import tika.parser
 
 from .base import Command
 from .arghelpers import format_file_path, process_files
 from ..utils import get_resources_path
 
-logging.getLogger("tika.tika").setLevel(logging.ERROR)
-
 
 class TikaCommand(Command):
 
@@ -26,6 +20,14 @@ class TikaCommand(Command):
 
     @classmethod
     def run(cls, args):
+        # tika and psutil are imported here to keep the startup of other
+        # commands fast
+        import psutil
+        import tika.tika
+        import tika.parser
+
+        logging.getLogger("tika.tika").setLevel(logging.ERROR)
+
         for fname in ("tika-server.jar", "tika-server.jar.md5"):
             dest_file = os.path.join(tempfile.gettempdir(), fname)
 
@@ -2,8 +2,6 @@
 
 import argparse
 
-import tkinter as tk
-
 from .base import Command, InvalidCommandArgs
 from ..utils import echo
 
@@ -51,6 +49,8 @@ class OracleFixCommand(Command):
 
     @classmethod
     def _init_gui(cls, app):
+        import tkinter as tk
+
         w = app.builder.get_object("TextXML2TSV")
         w.insert(tk.END, TEXT)
         w.configure(state=tk.DISABLED)
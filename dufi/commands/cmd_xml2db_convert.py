@@ -1,10 +1,12 @@
 # [SublimeLinter @python:3]
 
+import os
+
 from .xml2db import XML2DBConvert
 
 from .base import Command
 from .arghelpers import GUIOpt, process_files
-from ..utils import echo
+from .progress import Progress
 
 
 class XML2DBCommand(Command):
@@ -26,10 +28,13 @@ class XML2DBCommand(Command):
             xml2db.feed(None)
 
         else:
+            # the parser does not report its position, so only the start
+            # and the end of a file are shown
             for file in process_files(args):
-                echo("Progress: 0%")
+                progress = Progress(os.path.getsize(file))
+                progress.update(0)
                 xml2db.feed(file)
-                echo("Progress: 100%")
+                progress.finish()
 
         xml2db.finalize()
 
@@ -1,10 +1,12 @@
 # [SublimeLinter @python:3]
 
+import os
+
 from .xml2db import XML2DBSchema
 
 from .base import Command
 from .arghelpers import GUIOpt, process_files
-from ..utils import echo
+from .progress import Progress
 
 
 class XML2DBSchemaCommand(Command):
@@ -31,9 +33,10 @@ class XML2DBSchemaCommand(Command):
         xml2db = XML2DBSchema(ignore_attrs)
 
         for file in process_files(args):
-            echo("Progress: 0%")
+            progress = Progress(os.path.getsize(file))
+            progress.update(0)
             xml2db.collect_stats(file)
-            echo("Progress: 100%")
+            progress.finish()
 
         xml2db.dump_schema(args.out_schema)
 
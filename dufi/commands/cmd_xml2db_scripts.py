@@ -1,7 +1,6 @@
 # [SublimeLinter @python:3]
 
 import os
-import win32console
 
 from .base import Command
 from .xml2db import XML2DB
@@ -69,6 +68,8 @@ class XML2DBScripts(XML2DB):
         return "varbinary(max)"
 
     def _create_bcp_script(self, file, server, database, compressed):
+        import win32console
+
         cp = win32console.GetConsoleOutputCP()
         fp = open(file, "w", encoding="cp{}".format(cp))
 
@@ -0,0 +1,125 @@
+# [SublimeLinter @python:3]
+
+
+EOL_BLOCK_SIZE = 1024 * 1024
+
+
+class EOLCounter():
+
+    # counts CR+LF, bare LF and bare CR line endings in data fed by blocks;
+    # a CR at the end of a block is classified with the next block
+
+    def __init__(self):
+        super().__init__()
+
+        self.crlf = 0
+        self.lf = 0
+        self.cr = 0
+
+        self._pending_cr = False
+
+    def feed(self, block):
+        if not block:
+            return
+
+        crlf = block.count(b"\r\n")
+        lf = block.count(b"\n") - crlf
+        cr = block.count(b"\r") - crlf
+
+        if self._pending_cr:
+            if block[0] == 10:
+                crlf += 1
+                lf -= 1
+            else:
+                cr += 1
+
+        self._pending_cr = block[-1] == 13
+
+        if self._pending_cr:
+            cr -= 1
+
+        self.crlf += crlf
+        self.lf += lf
+        self.cr += cr
+
+    def close(self):
+        if self._pending_cr:
+            self.cr += 1
+            self._pending_cr = False
+
+    @property
+    def lines(self):
+        return self.crlf + self.lf
+
+    @property
+    def style(self):
+        # bare CR is not a line ending for the tools, so it does not affect
+        # the style
+        if self.crlf and self.lf:
+            return "mixed"
+
+        if self.crlf:
+            return "windows"
+
+        if self.lf:
+            return "unix"
+
+        return "unknown"
+
+
+def count_eols(data, lines_limit=None):
+    # counts line endings in the first lines_limit lines of data (bytes)
+
+    end = len(data)
+
+    if lines_limit is not None and data.count(b"\n") > lines_limit:
+        end = _find_lines_end(data, lines_limit)
+
+    counter = EOLCounter()
+    counter.feed(data[:end] if end < len(data) else data)
+    counter.close()
+
+    return counter
+
+
+def count_eols_in_file(fp, counter=None, stop_on_mixed=False,
+                       block_size=EOL_BLOCK_SIZE, lines_limit=None, head=b""):
+    # counts line endings from the current position of fp till the end of
+    # the file or the first lines_limit lines; counter can be given to
+    # continue counting of the data which has already been read, head is the
+    # data read from fp but not counted yet
+
+    if counter is None:
+        counter = EOLCounter()
+
+    fp_read = fp.read
+    block = head or fp_read(block_size)
+
+    while block:
+        if lines_limit is not None:
+            rest = lines_limit - counter.lines
+
+            if block.count(b"\n") >= rest:
+                counter.feed(block[:_find_lines_end(block, rest)])
+                break
+
+        counter.feed(block)
+
+        if stop_on_mixed and counter.crlf and counter.lf:
+            break
+
+        block = fp_read(block_size)
+
+    counter.close()
+
+    return counter
+
+
+def _find_lines_end(data, lines):
+    # returns the end of the first lines of data
+    end = -1
+
+    for _ in range(lines):
+        end = data.find(b"\n", end + 1)
+
+    return end + 1
@@ -0,0 +1,119 @@
+# [SublimeLinter @python:3]
+
+import os
+import sys
+import json
+import struct
+
+
+# events are sent to a pipe given by --events as frames: the length of the
+# payload (uint32, little-endian) followed by a JSON object with the "event"
+# key; the events are:
+#
+#     progress    percent, pos, rows, seconds (since the start of the scan)
+#     throughput  bytes, rows, seconds (of the whole scan)
+#     file_start  index (from 1), count, file
+#     file_end    index, count, file
+#     warning     message
+#     exit        code (sent by a worker at the end of a job)
+#
+# a frame is written by a single unbuffered write, the progress events are
+# limited by PROGRESS_INTERVAL as the progress messages
+EVENT_HEADER = struct.Struct("<I")
+
+_channel = None
+_channel_pid = None
+_channel_arg = None
+_current_file = None
+
+
+def open_event_channel(arg):
+    # arg is a file descriptor on POSIX and a handle on Windows, since the
+    # descriptors of the parent process are not inherited there; the same
+    # pipe is kept open for the next commands run by a worker
+
+    global _channel_arg
+
+    if arg is None:
+        set_event_channel(None)
+        return
+
+    if arg == _channel_arg and _channel is not None:
+        set_event_channel(_channel)
+        return
+
+    if sys.platform == "win32":
+        import msvcrt
+        fd = msvcrt.open_osfhandle(arg, 0)
+    else:
+        fd = arg
+
+    set_event_channel(open(fd, "wb", buffering=0))
+    _channel_arg = arg
+
+
+def set_event_channel(fp):
+    global _channel, _channel_pid, _channel_arg, _current_file
+
+    if fp is None:
+        _channel_arg = None
+
+    _channel = fp
+    _channel_pid = os.getpid()
+    _current_file = None
+
+
+def is_event_channel_open():
+    # forked worker processes of a command do not send events
+    return _channel is not None and _channel_pid == os.getpid()
+
+
+def send_event(event, **kwargs):
+    if not is_event_channel_open():
+        return
+
+    kwargs["event"] = event
+    payload = json.dumps(kwargs).encode("utf-8")
+    _channel.write(EVENT_HEADER.pack(len(payload)) + payload)
+
+
+def send_file_start(index, count, file):
+    # a file ends when the next one starts or the command finishes
+
+    global _current_file
+
+    if not is_event_channel_open():
+        return
+
+    send_file_end()
+    _current_file = (index, count, file)
+    send_event("file_start", index=index, count=count, file=file)
+
+
+def send_file_end():
+    global _current_file
+
+    if _current_file is None:
+        return
+
+    index, count, file = _current_file
+    _current_file = None
+    send_event("file_end", index=index, count=count, file=file)
+
+
+def read_events(fp):
+    # yields the events of a binary stream until it ends
+
+    while True:
+        header = fp.read(EVENT_HEADER.size)
+
+        if len(header) < EVENT_HEADER.size:
+            return
+
+        size, = EVENT_HEADER.unpack(header)
+        payload = fp.read(size)
+
+        if len(payload) < size:
+            return
+
+        yield json.loads(payload.decode("utf-8"))
@@ -2,11 +2,32 @@
 
 import sys
 import os
+import io
 import codecs
 import csv
+from concurrent.futures import as_completed
 
+from .parallel import get_pool, split_file
 
-BUFFER_SIZE = 50 * 1024 * 1024
+
+BUFFER_SIZE = 4 * 1024 * 1024
+
+# rows converted from CSV to TSV are cleaned up, encoded and written by
+# batches; values of a batch are joined with TSV_VALUE_MARK and rows with
+# TSV_ROW_MARK, so tabs, CR and LF inside of values are replaced by a few
+# str.replace() calls for the whole batch; if the marks themselves occur
+# in the data, the batch is cleaned up value by value
+TSV_BATCH_ROWS = 4096
+TSV_VALUE_MARK = "\x00"
+TSV_ROW_MARK = "\x01"
+
+# built-in single-byte codecs which are not charmap based
+SINGLE_BYTE_CODECS = ("ascii", "iso8859-1")
+
+NATIVE_ORDER_BOMS = {
+    "utf-16": (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE),
+    "utf-32": (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE),
+}
 
 
 def iconv(from_code,
@@ -16,7 +37,8 @@ def iconv(from_code,
           separator=None,
           with_qualifier=True,
           add_filename=False,
-          drop_first_row=False):
+          drop_first_row=False,
+          jobs=1):
     from_code = from_code.lower().replace("_", "-")
     to_code = to_code.lower().replace("_", "-")
 
@@ -44,7 +66,7 @@ def iconv(from_code,
         fin = open(inputfile, "rb")
         close_fin = True
     else:
-        fin = sys.stdin.buffer.raw
+        fin = io.BufferedReader(sys.stdin.buffer.raw)
         close_fin = False
 
     if output:
@@ -61,51 +83,223 @@ def iconv(from_code,
         fout.write(to_bom)
 
     if separator is None:
-        while True:
-            data = fin.read(BUFFER_SIZE)
+        table = get_translation_table(from_code, to_code)
 
-            if not data:
-                break
+        if table is None:
+            _transcode(fin, fout, from_code, to_code)
+
+        elif jobs > 1 and inputfile and output \
+                and _translate_parallel(fin, fout, table, jobs):
+            pass
 
-            fout.write(data.decode(from_code, errors="replace")
-                           .encode(to_code, errors="replace"))
+        else:
+            _translate(fin, fout, table)
 
     else:
         filename = os.path.normpath(inputfile).replace("\t", " ").replace("\n", " ")
+        _csv_to_tsv(fin, fout, from_code, to_code, separator, with_qualifier,
+                    filename if add_filename else None, drop_first_row)
+
+    fout.flush()
+
+    if close_fin:
+        fin.close()
+
+    if close_fout:
+        fout.close()
+
+
+def _format_tsv_batch(rows, prefix):
+    strip = str.strip
+
+    text = TSV_ROW_MARK.join(
+        [TSV_VALUE_MARK.join(map(strip, row)) for row in rows])
+
+    marks = sum(map(len, rows)) - len(rows) + rows.count([])
+
+    if text.count(TSV_VALUE_MARK) == marks \
+            and text.count(TSV_ROW_MARK) == len(rows) - 1:
+        text = text.replace("\t", " ").replace("\r", " ").replace("\n", "")
+        text = text.replace(TSV_VALUE_MARK, "\t")
+        text = text.replace(TSV_ROW_MARK, "\r\n" + prefix)
+        return prefix + text + "\r\n"
+
+    return "".join([prefix + "\t".join([
+        value.strip().replace("\t", " ").replace("\r", " ").replace("\n", "")
+        for value in row]) + "\r\n" for row in rows])
+
+
+def _get_single_byte_chars(code):
+    # returns 256 characters decoded from each byte if the encoding is a
+    # single-byte one, otherwise None
+
+    info = codecs.lookup(code)
+
+    if info.name not in SINGLE_BYTE_CODECS:
+        module = sys.modules.get(info.incrementaldecoder.__module__)
+
+        if not isinstance(getattr(module, "decoding_table", None), str):
+            return None
+
+    chars = [bytes((i, )).decode(code, errors="replace") for i in range(256)]
+
+    if any(len(c) != 1 for c in chars):
+        return None
+
+    return chars
+
+
+def get_translation_table(from_code, to_code):
+    # returns a bytes.translate() table which converts single-byte encoded
+    # text in the same way as decoding and encoding with errors="replace"
+    # does; None if any of the encodings is not a single-byte one
+
+    chars = _get_single_byte_chars(from_code)
+
+    if chars is None or _get_single_byte_chars(to_code) is None:
+        return None
+
+    table = b"".join(c.encode(to_code, errors="replace") for c in chars)
+
+    if len(table) != 256:
+        return None
+
+    return table
+
+
+def _get_decoding(fin, from_code):
+    # the incremental decoders of utf-16 and utf-32 fail without BOM while
+    # bytes.decode() falls back to the native byte order
+
+    name = codecs.lookup(from_code).name
 
-        ufin = codecs.getreader(from_code)(fin, errors="replace")
-        ufout = codecs.getwriter(to_code)(fout, errors="replace")
+    if name in NATIVE_ORDER_BOMS \
+            and not fin.peek(4).startswith(NATIVE_ORDER_BOMS[name]):
+        return "{}-{}e".format(name, sys.byteorder[0])
 
-        csv_args = {
-            "delimiter": bytes([separator]).decode()
-        }
+    return from_code
 
-        if not with_qualifier:
-            csv_args["quoting"] = csv.QUOTE_NONE
-            csv_args["escapechar"] = ""
-            csv_args["quotechar"] = ""
 
-        it = iter(csv.reader(ufin, **csv_args))
+def _transcode(fin, fout, from_code, to_code):
+    # incremental codecs keep the state between blocks, so a multibyte
+    # sequence split by a block boundary is decoded correctly
 
-        if drop_first_row:
-            next(it)
+    decode = codecs.getincrementaldecoder(_get_decoding(fin, from_code))(
+        errors="replace").decode
+    encode = codecs.getincrementalencoder(to_code)(errors="replace").encode
 
-        for row in it:
-            if add_filename:
-                ufout.write(filename)
-                ufout.write("\t")
+    fin_read = fin.read
+    fout_write = fout.write
 
-            ufout.write("\t".join(
-                value.strip().replace("\t", " ").replace("\r", " ").replace("\n", "")
-                for value in row))
-            ufout.write("\r\n")
+    # nothing is encoded for empty text, otherwise encoders like utf-16 emit
+    # BOM for an empty input
 
-        ufout.flush()
+    while True:
+        data = fin_read(BUFFER_SIZE)
+        text = decode(data, not data)
 
+        if text:
+            fout_write(encode(text))
+
+        if not data:
+            break
+
+
+def _csv_to_tsv(fin, fout, from_code, to_code, separator, with_qualifier,
+                filename, drop_first_row):
+    ufin = io.TextIOWrapper(fin, encoding=_get_decoding(fin, from_code),
+                            errors="replace", newline="")
+    encode = codecs.getincrementalencoder(to_code)(errors="replace").encode
+    fout_write = fout.write
+
+    csv_args = {
+        "delimiter": bytes([separator]).decode()
+    }
+
+    if not with_qualifier:
+        csv_args["quoting"] = csv.QUOTE_NONE
+        csv_args["quotechar"] = None
+
+    it = iter(csv.reader(ufin, **csv_args))
+
+    if drop_first_row:
+        next(it, None)
+
+    prefix = filename + "\t" if filename is not None else ""
+
+    rows = []
+    rows_append = rows.append
+
+    for row in it:
+        rows_append(row)
+
+        if len(rows) >= TSV_BATCH_ROWS:
+            fout_write(encode(_format_tsv_batch(rows, prefix)))
+            del rows[:]
+
+    if rows:
+        fout_write(encode(_format_tsv_batch(rows, prefix)))
+
+    # fin is closed by the caller
+    ufin.detach()
+
+
+def _translate(fin, fout, table):
+    fin_read = fin.read
+    fout_write = fout.write
+
+    while True:
+        data = fin_read(BUFFER_SIZE)
+
+        if not data:
+            break
+
+        fout_write(data.translate(table))
+
+
+def _translate_parallel(fin, fout, table, jobs):
+    # the output of a single-byte conversion has the same size as the
+    # input, so each process can translate its own range of the input file
+    # and write it right at its place in the output file; returns False if
+    # the file is too small to be split
+
+    ranges = split_file(fin.name, jobs)
+
+    if len(ranges) <= 1:
+        return False
+
+    start_offset = fin.tell()
     fout.flush()
+    out_offset = fout.tell() - start_offset
 
-    if close_fin:
-        fin.close()
+    ranges = [(max(start, start_offset), stop) for start, stop in ranges
+              if stop > start_offset]
 
-    if close_fout:
-        fout.close()
+    fout.truncate(out_offset + ranges[-1][1])
+
+    with get_pool(jobs) as pool:
+        futures = [pool.submit(_translate_range, fin.name, fout.name, table,
+                               start, stop, out_offset)
+                   for start, stop in ranges]
+
+        for future in as_completed(futures):
+            future.result()
+
+    fout.seek(0, os.SEEK_END)
+
+    return True
+
+
+def _translate_range(inputfile, output, table, start, stop, out_offset):
+    with open(inputfile, "rb") as fin, open(output, "r+b") as fout:
+        fin.seek(start)
+        fout.seek(out_offset + start)
+
+        while start < stop:
+            data = fin.read(min(BUFFER_SIZE, stop - start))
+
+            if not data:
+                break
+
+            fout.write(data.translate(table))
+            start += len(data)
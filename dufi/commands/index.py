@@ -0,0 +1,233 @@
+# [SublimeLinter @python:3]
+
+import os
+import sys
+import struct
+import bisect
+from array import array
+from concurrent.futures import as_completed
+
+from .parallel import get_pool, split_file
+from .progress import Progress
+from .cdufi import index_lines_range
+
+
+INDEX_FILE_EXT = ".dufiindex"
+
+# signature, size and mtime of the data file, number of lines, separator
+# and qualifier (-1 if separators are not counted / values are not quoted);
+# the header is followed by the offsets of the lines (uint64) and then by
+# the numbers of separators in the lines (uint32), both little-endian
+INDEX_SIGNATURE = b"DUFIINDEX\x01"
+INDEX_HEADER = struct.Struct("<10sQqQhh")
+
+
+class LineIndex():
+
+    # byte offsets of the lines of a file; lines are numbered from 1 as in
+    # reports and patches
+
+    def __init__(self, offsets, file_size, file_mtime_ns=0, counts=None,
+                 separator=-1, qualifier=-1):
+        super().__init__()
+
+        self.offsets = offsets
+        self.counts = counts
+        self.file_size = file_size
+        self.file_mtime_ns = file_mtime_ns
+        self.separator = separator if counts is not None else -1
+        self.qualifier = qualifier if counts is not None else -1
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get_range(self, n):
+        # returns (start, stop) of the n-th line including its EOL
+
+        if not 1 <= n <= len(self.offsets):
+            raise IndexError(n)
+
+        if n < len(self.offsets):
+            return self.offsets[n-1], self.offsets[n]
+
+        return self.offsets[n-1], self.file_size
+
+    def get_count(self, n):
+        if self.counts is None:
+            raise ValueError("separators are not counted")
+
+        return self.counts[n-1]
+
+    def find_line(self, offset):
+        # returns the number of the line which contains the byte at offset
+
+        if not 0 <= offset < self.file_size:
+            raise IndexError(offset)
+
+        return bisect.bisect_right(self.offsets, offset)
+
+    def read_line(self, fp, n):
+        start, stop = self.get_range(n)
+        fp.seek(start)
+        return fp.read(stop - start)
+
+    def is_valid_for(self, file):
+        stat = os.stat(file)
+        return stat.st_size == self.file_size \
+            and stat.st_mtime_ns == self.file_mtime_ns
+
+    def save(self, file):
+        offsets = self.offsets
+        counts = self.counts
+
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+
+            if counts is not None:
+                counts = array("I", counts)
+                counts.byteswap()
+
+        tmp_file = file + ".tmp"
+
+        with open(tmp_file, "wb") as fp:
+            fp.write(INDEX_HEADER.pack(
+                INDEX_SIGNATURE, self.file_size, self.file_mtime_ns,
+                len(offsets), self.separator, self.qualifier))
+            offsets.tofile(fp)
+
+            if counts is not None:
+                counts.tofile(fp)
+
+        os.replace(tmp_file, file)
+
+    @classmethod
+    def load(cls, file):
+        with open(file, "rb") as fp:
+            header = fp.read(INDEX_HEADER.size)
+
+            if len(header) != INDEX_HEADER.size:
+                raise ValueError("invalid index file")
+
+            signature, file_size, file_mtime_ns, lines, separator, \
+                qualifier = INDEX_HEADER.unpack(header)
+
+            if signature != INDEX_SIGNATURE:
+                raise ValueError("invalid index file")
+
+            offsets = array("Q")
+            counts = None
+
+            try:
+                offsets.fromfile(fp, lines)
+
+                if separator >= 0:
+                    counts = array("I")
+                    counts.fromfile(fp, lines)
+            except EOFError:
+                raise ValueError("index file is truncated")
+
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+            if counts is not None:
+                counts.byteswap()
+
+        return cls(offsets, file_size, file_mtime_ns, counts,
+                   separator, qualifier)
+
+
+def get_index_file(file):
+    return file + INDEX_FILE_EXT
+
+
+def build_index(file, separator=-1, qualifier=-1, jobs=1):
+    # scans the file by ranges; the ranges are processed by worker
+    # processes if jobs > 1, and one by one otherwise
+
+    stat = os.stat(file)
+    ranges = split_file(file, jobs)
+
+    offsets = array("Q")
+    counts = array("I") if separator >= 0 else None
+
+    progress = Progress(stat.st_size)
+    done = 0
+
+    if len(ranges) > 1 and jobs > 1:
+        with get_pool(jobs) as pool:
+            futures = {}
+
+            for start, stop in ranges:
+                future = pool.submit(index_lines_range,
+                                     file, start, stop, separator, qualifier)
+                futures[future] = stop - start
+
+            for future in as_completed(futures):
+                done += futures[future]
+                progress.update(done)
+
+            results = [future.result() for future in futures]
+    else:
+        results = []
+
+        for start, stop in ranges:
+            results.append(index_lines_range(
+                file, start, stop, separator, qualifier))
+            done += stop - start
+            progress.update(done)
+
+    for range_offsets, range_counts in results:
+        offsets.extend(range_offsets)
+
+        if counts is not None:
+            counts.extend(range_counts)
+
+    progress.finish(done, len(offsets))
+
+    return LineIndex(offsets, stat.st_size, stat.st_mtime_ns, counts,
+                     separator, qualifier)
+
+
+def get_indexed_lines(file):
+    # returns the number of lines saved in the index of the file if it is up
+    # to date, otherwise None; only the header of the index is read
+
+    try:
+        with open(get_index_file(file), "rb") as fp:
+            header = fp.read(INDEX_HEADER.size)
+
+        stat = os.stat(file)
+    except OSError:
+        return None
+
+    if len(header) != INDEX_HEADER.size:
+        return None
+
+    signature, file_size, file_mtime_ns, lines, _, _ = \
+        INDEX_HEADER.unpack(header)
+
+    if signature != INDEX_SIGNATURE or file_size != stat.st_size \
+            or file_mtime_ns != stat.st_mtime_ns:
+        return None
+
+    return lines
+
+
+def load_index(file, separator=-1, qualifier=-1):
+    # returns the saved index of the file if it is up to date and has the
+    # separators counted in the requested way (if requested), otherwise None
+
+    try:
+        index = LineIndex.load(get_index_file(file))
+    except (OSError, ValueError):
+        return None
+
+    if not index.is_valid_for(file):
+        return None
+
+    if separator >= 0 and (index.separator != separator
+                           or index.qualifier != qualifier):
+        return None
+
+    return index
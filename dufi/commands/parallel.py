@@ -0,0 +1,72 @@
+# [SublimeLinter @python:3]
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import set_cache_enabled, is_cache_enabled
+
+
+# ProcessPoolExecutor cannot wait for more than 61 processes on Windows
+MAX_JOBS = 61
+
+# files smaller than this are not split into ranges
+MIN_RANGE_SIZE = 16 * 1024 * 1024
+
+# several ranges per process to keep all of them busy till the end
+RANGES_PER_JOB = 4
+
+
+def get_jobs(args):
+    jobs = getattr(args, "jobs", 1) or os.cpu_count() or 1
+    return max(1, min(jobs, MAX_JOBS))
+
+
+def get_pool(jobs):
+    # the worker processes are spawned on Windows, so they do not inherit
+    # the --no-cache switch
+    return ProcessPoolExecutor(
+        max_workers=jobs, initializer=set_cache_enabled,
+        initargs=(is_cache_enabled(), ))
+
+
+def split_file(file, jobs, sep=b"\n"):
+    # returns (start, stop) byte ranges; each range but the last one ends
+    # right after `sep`, so no line is divided between two ranges
+
+    size = os.path.getsize(file)
+    parts = min(jobs * RANGES_PER_JOB, size // MIN_RANGE_SIZE)
+
+    if parts <= 1:
+        return [(0, size)]
+
+    bounds = [0]
+
+    with open(file, "rb") as fp:
+        for i in range(1, parts):
+            pos = max(size * i // parts, bounds[-1])
+            fp.seek(pos)
+
+            while True:
+                buf = fp.read(64 * 1024)
+
+                if not buf:
+                    pos = size
+                    break
+
+                j = buf.find(sep)
+
+                if j >= 0:
+                    pos += j + 1
+                    break
+
+                pos += len(buf)
+
+            if pos >= size:
+                break
+
+            if pos > bounds[-1]:
+                bounds.append(pos)
+
+    bounds.append(size)
+
+    return list(zip(bounds[:-1], bounds[1:]))
@@ -1,52 +1,353 @@
 # [SublimeLinter @python:3]
 
+import sys
+import os
+import mmap
+from array import array
+
 from ..utils import echo
 
 
+# Binary patch layout (all numbers are little-endian):
+#   signature, number of replacements N (uint64),
+#   N offsets (uint64, sorted), N expected codes (uint8), N replace codes (uint8)
+# Text patch layout: `offset:expected_code:replace_code` per line; lines
+# starting with # are ignored.
+
+BINARY_PATCH_SIGNATURE = b"DUFIPATCH\x01"
+
+
+class PatchError(Exception):
+    pass
+
+
+class TextPatchWriter():
+
+    # replacements are formatted and written by batches
+    BATCH_SIZE = 64 * 1024
+
+    def __init__(self, patch_file):
+        super().__init__()
+
+        self._fp = open(patch_file, "w")
+
+        self._offsets = array("Q")
+        self._expected_codes = array("B")
+        self._replace_codes = array("B")
+
+        self._offsets_append = self._offsets.append
+        self._expected_codes_append = self._expected_codes.append
+        self._replace_codes_append = self._replace_codes.append
+
+    def add(self, offset, expected_code, replace_code):
+        self._offsets_append(offset)
+        self._expected_codes_append(expected_code)
+        self._replace_codes_append(replace_code)
+
+        if len(self._offsets) >= self.BATCH_SIZE:
+            self._flush()
+
+    def extend(self, offsets, expected_codes, replace_codes):
+        self._flush()
+
+        for i in range(0, len(offsets), self.BATCH_SIZE):
+            j = i + self.BATCH_SIZE
+            self._write(offsets[i:j], expected_codes[i:j], replace_codes[i:j])
+
+    def _flush(self):
+        self._write(self._offsets, self._expected_codes, self._replace_codes)
+
+        del self._offsets[:]
+        del self._expected_codes[:]
+        del self._replace_codes[:]
+
+    def _write(self, offsets, expected_codes, replace_codes):
+        self._fp.write("".join(map(
+            "{}:{}:{}\n".format, offsets, expected_codes, replace_codes)))
+
+    def close(self):
+        self._flush()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BinaryPatchWriter():
+
+    def __init__(self, patch_file):
+        super().__init__()
+
+        self._patch_file = patch_file
+
+        self._offsets = array("Q")
+        self._expected_codes = array("B")
+        self._replace_codes = array("B")
+
+        self._offsets_append = self._offsets.append
+        self._expected_codes_append = self._expected_codes.append
+        self._replace_codes_append = self._replace_codes.append
+
+    def add(self, offset, expected_code, replace_code):
+        self._offsets_append(offset)
+        self._expected_codes_append(expected_code)
+        self._replace_codes_append(replace_code)
+
+    def extend(self, offsets, expected_codes, replace_codes):
+        self._offsets.extend(offsets)
+        self._expected_codes.extend(expected_codes)
+        self._replace_codes.extend(replace_codes)
+
+    def close(self):
+        offsets = self._offsets
+        expected_codes = self._expected_codes
+        replace_codes = self._replace_codes
+
+        # scanners emit offsets in ascending order, so sorting is rarely
+        # needed
+        if any(a > b for a, b in zip(offsets, offsets[1:])):
+            order = sorted(range(len(offsets)), key=offsets.__getitem__)
+            offsets = array("Q", (offsets[i] for i in order))
+            expected_codes = array("B", (expected_codes[i] for i in order))
+            replace_codes = array("B", (replace_codes[i] for i in order))
+
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+
+        with open(self._patch_file, "wb") as fp:
+            fp.write(BINARY_PATCH_SIGNATURE)
+            fp.write(len(offsets).to_bytes(8, "little"))
+            offsets.tofile(fp)
+            expected_codes.tofile(fp)
+            replace_codes.tofile(fp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+
+
+class InPlacePatcher():
+
+    # applies replacements to the file as soon as they are found instead of
+    # saving them into a patch and applying it afterwards; the patch
+    # (journal) can still be saved to be able to revert the changes
+
+    def __init__(self, csv_file, journal=None, force=False):
+        super().__init__()
+
+        self._fp = open(csv_file, "r+b")
+        self._journal = journal
+        self._force = force
+        self._read_count = 0
+        self._applied_count = 0
+        self._size = os.fstat(self._fp.fileno()).st_size
+
+        if self._size:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_WRITE)
+        else:
+            self._mm = None
+
+    def add(self, offset, expected_code, replace_code):
+        # the same checks as patch() does; the scan is aborted by PatchError
+        # unless an unexpected char is forced to be replaced
+        self._read_count += 1
+
+        if offset >= self._size:
+            echo("ERRPR: patch is not applicable")
+            raise PatchError("offset {} is out of the file".format(offset))
+
+        char_code = self._mm[offset]
+
+        if char_code == replace_code:
+            return
+
+        if char_code != expected_code:
+            echo("ERROR: unexpected char at", offset)
+
+            if not self._force:
+                raise PatchError("unexpected char at {}".format(offset))
+
+        self._mm[offset] = replace_code
+        self._applied_count += 1
+
+        # the journal keeps the char actually replaced, so a forced patch can
+        # be reverted as well
+        if self._journal is not None:
+            self._journal.add(offset, char_code, replace_code)
+
+    def extend(self, offsets, expected_codes, replace_codes):
+        add = self.add
+
+        for offset, expected_code, replace_code \
+                in zip(offsets, expected_codes, replace_codes):
+            add(offset, expected_code, replace_code)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+
+        self._fp.close()
+
+        if self._journal is not None:
+            self._journal.close()
+
+        echo("Replacements applied: {} / {}".format(
+            self._applied_count, self._read_count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_patch_writer(patch_file, binary=False):
+    if binary:
+        return BinaryPatchWriter(patch_file)
+
+    return TextPatchWriter(patch_file)
+
+
+def open_patch_output(csv_file, patch_file, args):
+    # returns the object the scanners pass replacements to according to
+    # the patch arguments of a command (see Command._add_patch_arguments)
+
+    if not args.in_place_stream:
+        return open_patch_writer(patch_file, args.binary_patch)
+
+    if args.no_journal:
+        journal = None
+    else:
+        journal = open_patch_writer(patch_file, args.binary_patch)
+
+    return InPlacePatcher(csv_file, journal, args.force)
+
+
+def check_patch_args(args):
+    # returns an error message if the patch arguments are inconsistent
+
+    if args.no_journal and not args.in_place_stream:
+        return "--no-journal requires --in-place-stream"
+
+    if args.force and not args.in_place_stream:
+        return "--force requires --in-place-stream"
+
+    return None
+
+
+def read_patch(patch_file):
+    with open(patch_file, "rb") as fp:
+        if fp.read(len(BINARY_PATCH_SIGNATURE)) == BINARY_PATCH_SIGNATURE:
+            return _read_binary_patch(fp)
+
+    with open(patch_file, "r") as fp:
+        return _read_text_patch(fp)
+
+
+def _read_binary_patch(fp):
+    count = int.from_bytes(fp.read(8), "little")
+
+    offsets = array("Q")
+    expected_codes = array("B")
+    replace_codes = array("B")
+
+    try:
+        offsets.fromfile(fp, count)
+        expected_codes.fromfile(fp, count)
+        replace_codes.fromfile(fp, count)
+    except EOFError:
+        raise PatchError("truncated patch file")
+
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    return offsets, expected_codes, replace_codes
+
+
+def _read_text_patch(fp):
+    offsets = array("Q")
+    expected_codes = array("B")
+    replace_codes = array("B")
+
+    offsets_append = offsets.append
+    expected_codes_append = expected_codes.append
+    replace_codes_append = replace_codes.append
+
+    for line in fp:
+        if line.startswith("#"):
+            continue
+
+        try:
+            offset, expected_code, replace_code = map(int, line.rstrip().split(":"))
+            offsets_append(offset)
+            expected_codes_append(expected_code)
+            replace_codes_append(replace_code)
+        except (ValueError, OverflowError):
+            raise PatchError("invalid patch line: {!r}".format(line))
+
+    return offsets, expected_codes, replace_codes
+
+
 def patch(csv_file, patch_file, reverse=False, dry_run=False, force=False):
+    try:
+        offsets, expected_codes, replace_codes = read_patch(patch_file)
+    except PatchError:
+        echo("ERROR: invalid patch file")
+        return 1
+
+    if reverse:
+        expected_codes, replace_codes = replace_codes, expected_codes
+
     read_count = 0
     applied_count = 0
 
-    with open(csv_file, "r+b") as fp_csv, \
-            open(patch_file, "r") as fp_patch:
-        for line in fp_patch:
-            if line.startswith("#"):
-                continue
+    if not offsets:
+        echo("Replacements applied: 0 / 0")
+        return 0
 
-            try:
-                offset, expected_code, replace_code = map(int, line.rstrip().split(":"))
-            except ValueError:
-                echo("ERROR: invalid patch file")
-                return 1
+    with open(csv_file, "rb" if dry_run else "r+b") as fp_csv:
+        size = os.fstat(fp_csv.fileno()).st_size
 
-            if reverse:
-                expected_code, replace_code = replace_code, expected_code
+        if not size:
+            echo("ERRPR: patch is not applicable")
+            return 1
 
-            fp_csv.seek(offset)
-            char = fp_csv.read(1)
+        mm = mmap.mmap(fp_csv.fileno(), 0, access=mmap.ACCESS_READ
+                       if dry_run else mmap.ACCESS_WRITE)
 
-            if not char:
-                echo("ERRPR: patch is not applicable")
-                return 1
+        try:
+            for offset, expected_code, replace_code \
+                    in zip(offsets, expected_codes, replace_codes):
+                if offset >= size:
+                    echo("ERRPR: patch is not applicable")
+                    return 1
 
-            char_code = ord(char)
-            read_count += 1
+                char_code = mm[offset]
+                read_count += 1
 
-            if char_code == replace_code:
-                continue
+                if char_code == replace_code:
+                    continue
 
-            if char_code != expected_code:
-                echo("ERROR: unexpected char at", offset)
+                if char_code != expected_code:
+                    echo("ERROR: unexpected char at", offset)
 
-                if not force:
-                    return 1
+                    if not force:
+                        return 1
 
-            fp_csv.seek(offset)
+                if not dry_run:
+                    mm[offset] = replace_code
 
-            if not dry_run:
-                fp_csv.write(bytes((replace_code, )))
+                applied_count += 1
 
-            applied_count += 1
+        finally:
+            mm.close()
 
     echo("Replacements applied: {} / {}".format(applied_count, read_count))
     return 0
@@ -0,0 +1,331 @@
+# [SublimeLinter @python:3]
+
+import os
+import re
+import time
+
+from .progress import Progress
+
+
+PROFILE_BLOCK_SIZE = 4 * 1024 * 1024
+
+# a sample is taken by windows evenly spaced across the file; each window
+# has up to SAMPLE_WINDOW_ROWS rows starting after the first line break
+# found in it; files smaller than SAMPLE_MIN_WINDOW_SIZE per window are
+# profiled entirely
+SAMPLE_WINDOWS = 100
+SAMPLE_WINDOW_ROWS = 100
+SAMPLE_MIN_WINDOW_SIZE = 128 * 1024
+
+# types of values a column can have; a column which has values of different
+# types gets the most general one (TYPE_TEXT if they are not compatible)
+TYPE_INT = "int"
+TYPE_DECIMAL = "decimal"
+TYPE_DATE = "date"
+TYPE_DATETIME = "datetime"
+TYPE_TEXT = "text"
+
+_TYPE_JOINS = {
+    frozenset((TYPE_INT, TYPE_DECIMAL)): TYPE_DECIMAL,
+    frozenset((TYPE_DATE, TYPE_DATETIME)): TYPE_DATETIME,
+}
+
+# values of a column are joined with LF and tested by a single match; empty
+# values are allowed everywhere; leading zeros are not allowed in numbers,
+# so codes like 007 stay text; months, days and hours are checked by range,
+# so a column of 2020-13-45 is not reported as dates
+_INT = rb"-?(?:0|[1-9][0-9]*)"
+_DECIMAL = rb"-?(?:0|[1-9][0-9]*)\.[0-9]+"
+_DATE = rb"[12][0-9]{3}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12][0-9]|3[01])"
+_TIME = rb"(?:[01][0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9](?:\.[0-9]{1,7})?)?"
+_DATETIME = _DATE + rb"(?:[ T]" + _TIME + rb")?"
+
+
+def _compile_column_regex(value):
+    return re.compile(b"(?:" + value + b")?(?:\n(?:" + value + b")?)*")
+
+
+_COLUMN_REGEXES = (
+    (TYPE_INT, _compile_column_regex(_INT)),
+    (TYPE_DECIMAL, _compile_column_regex(_DECIMAL + b"|" + _INT)),
+    (TYPE_DATE, _compile_column_regex(_DATE)),
+    (TYPE_DATETIME, _compile_column_regex(_DATETIME)),
+)
+
+
+class ColumnProfile():
+
+    # per-column statistics of a file: the maximal length of values in
+    # bytes (at least 1), the number of empty values, the type of non-empty
+    # values (None if there are no such values), the maximal numbers of
+    # digits of numbers before and after the decimal point
+
+    def __init__(self, columns=0):
+        super().__init__()
+
+        self.rows = 0
+        self.lengths = [1] * columns
+        self.nulls = [0] * columns
+        self.types = [None] * columns
+        self.int_digits = [0] * columns
+        self.scales = [0] * columns
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def extend(self, columns):
+        n = columns - len(self.lengths)
+
+        # the rows profiled before have no values in the new columns
+        if n > 0:
+            self.lengths.extend([1] * n)
+            self.nulls.extend([self.rows] * n)
+            self.types.extend([None] * n)
+            self.int_digits.extend([0] * n)
+            self.scales.extend([0] * n)
+
+    def to_dict(self):
+        return {"rows": self.rows,
+                "lengths": self.lengths,
+                "nulls": self.nulls,
+                "types": self.types,
+                "int_digits": self.int_digits,
+                "scales": self.scales}
+
+    @classmethod
+    def from_dict(cls, d):
+        profile = cls()
+
+        for key, value in d.items():
+            setattr(profile, key, value)
+
+        return profile
+
+    def update(self, rows, detect_types=True):
+        # rows are lists of values split by the separator
+
+        if not rows:
+            return
+
+        width = max(map(len, rows))
+        self.extend(width)
+        width = len(self.lengths)
+
+        # short rows are padded by empty values, so the rows can be turned
+        # into columns by zip()
+        if min(map(len, rows)) != width:
+            rows = [row + [b""] * (width - len(row)) for row in rows]
+
+        self.rows += len(rows)
+
+        lengths = self.lengths
+        nulls = self.nulls
+        types = self.types
+
+        for i, column in enumerate(zip(*rows)):
+            length = max(map(len, column))
+
+            if length > lengths[i]:
+                lengths[i] = length
+
+            nulls[i] += column.count(b"")
+
+            if detect_types and types[i] != TYPE_TEXT:
+                self._update_type(i, column)
+
+    def _update_type(self, i, column):
+        data = b"\n".join(column)
+
+        # a column of empty values does not change the type
+        if len(data) == len(column) - 1:
+            return
+
+        for value_type, regex in _COLUMN_REGEXES:
+            if regex.fullmatch(data):
+                break
+        else:
+            value_type = TYPE_TEXT
+
+        if value_type == TYPE_DECIMAL:
+            for value in column:
+                whole, _, fraction = value.lstrip(b"-").partition(b".")
+
+                if len(whole) > self.int_digits[i]:
+                    self.int_digits[i] = len(whole)
+
+                if len(fraction) > self.scales[i]:
+                    self.scales[i] = len(fraction)
+
+        elif value_type == TYPE_INT:
+            digits = max(len(value.lstrip(b"-")) for value in column)
+
+            if digits > self.int_digits[i]:
+                self.int_digits[i] = digits
+
+        self.types[i] = join_types(self.types[i], value_type)
+
+
+def join_types(a, b):
+    if a is None or a == b:
+        return b
+
+    if b is None:
+        return a
+
+    return _TYPE_JOINS.get(frozenset((a, b)), TYPE_TEXT)
+
+
+def profile_file(file, separator, has_header=False, encoding="cp1251",
+                 max_rows=None, detect_types=True, show_progress=True):
+    # returns the header (None if the file has no header) and the profile of
+    # the columns; only max_rows rows are profiled if it is not None
+
+    sep = bytes([separator])
+    header = None
+    profile = ColumnProfile()
+
+    progress = Progress(os.path.getsize(file)) if show_progress else None
+    pos = 0
+
+    with open(file, "rb") as fpi:
+        if has_header:
+            line = fpi.readline()
+            pos += len(line)
+            header = [x.decode(encoding)
+                      for x in line.rstrip(b"\r\n").split(sep)]
+            profile.extend(len(header))
+
+        tail = b""
+
+        while max_rows is None or profile.rows < max_rows:
+            # a line longer than a block is read with a growing buffer
+            data = fpi.read(max(PROFILE_BLOCK_SIZE, len(tail)))
+
+            if not data:
+                if tail:
+                    lines = [tail.rstrip(b"\r\n")]
+                else:
+                    break
+
+            else:
+                buf = tail + data if tail else data
+                stop = buf.rfind(b"\n")
+
+                if stop < 0:
+                    tail = buf
+                    continue
+
+                tail = buf[stop+1:]
+                lines = _split_lines(buf[:stop])
+
+            if max_rows is not None:
+                lines = lines[:max_rows - profile.rows]
+
+            profile.update([line.split(sep) for line in lines], detect_types)
+
+            pos += len(data)
+
+            if progress is not None:
+                progress.update(pos, profile.rows)
+
+            if not data:
+                break
+
+    if progress is not None:
+        progress.finish(rows=profile.rows)
+
+    return header, profile
+
+
+def _split_lines(text):
+    # all CR characters at the end of each line are dropped
+
+    while b"\r\n" in text:
+        text = text.replace(b"\r\n", b"\n")
+
+    lines = text.split(b"\n")
+    lines[-1] = lines[-1].rstrip(b"\r")
+
+    return lines
+
+
+def sample_file(file, separator, has_header=False, encoding="cp1251",
+                windows=SAMPLE_WINDOWS, time_limit=None, detect_types=True,
+                show_progress=True):
+    # returns the header and the profile of the rows of evenly spaced
+    # windows; the windows are visited from the coarsest spacing to the
+    # finest one, so the sample is spread across the file even if the time
+    # limit (seconds) is exceeded
+
+    if windows < 1:
+        raise ValueError("number of windows must be positive")
+
+    size = os.path.getsize(file)
+
+    if size <= windows * SAMPLE_MIN_WINDOW_SIZE:
+        return profile_file(file, separator, has_header, encoding,
+                            detect_types=detect_types,
+                            show_progress=show_progress)
+
+    sep = bytes([separator])
+    header = None
+    profile = ColumnProfile()
+
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+
+    with open(file, "rb") as fpi:
+        if has_header:
+            line = fpi.readline()
+            header = [x.decode(encoding)
+                      for x in line.rstrip(b"\r\n").split(sep)]
+            profile.extend(len(header))
+
+        data_start = fpi.tell()
+        bounds = [data_start + (size - data_start) * i // windows
+                  for i in range(windows + 1)]
+
+        for i in _get_spread_order(windows):
+            lines = _read_window(fpi, bounds[i], bounds[i+1],
+                                 bounds[i] > data_start, SAMPLE_WINDOW_ROWS)
+            profile.update([line.split(sep) for line in lines], detect_types)
+
+            if time_limit is not None and time.monotonic() > deadline:
+                break
+
+    return header, profile
+
+
+def _get_spread_order(n):
+    # 0, n/2, n/4, 3n/4, ... - indices ordered by their bit-reversed values
+
+    bits = max(n - 1, 1).bit_length()
+
+    def reverse(i):
+        return int("{:0{}b}".format(i, bits)[::-1], 2)
+
+    return sorted(range(n), key=reverse)
+
+
+def _read_window(fpi, start, stop, resync, rows):
+    # returns up to `rows` lines which start within [start, stop); if resync
+    # is true, the line which contains the byte before start is skipped, so
+    # each line belongs to a single window
+
+    if resync:
+        fpi.seek(start - 1)
+        fpi.readline()
+    else:
+        fpi.seek(start)
+
+    lines = []
+
+    while len(lines) < rows and fpi.tell() < stop:
+        line = fpi.readline()
+
+        if not line:
+            break
+
+        lines.append(line.rstrip(b"\r\n"))
+
+    return lines
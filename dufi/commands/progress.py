@@ -0,0 +1,116 @@
+# [SublimeLinter @python:3]
+
+import time
+
+from .events import is_event_channel_open, send_event
+from ..utils import echo
+
+
+# minimal interval between two progress messages, seconds
+PROGRESS_INTERVAL = 0.1
+
+# scanners call Progress.update() each 1/PROGRESS_STEPS of the file but not
+# more often than each MIN_PROGRESS_STEP bytes
+PROGRESS_STEPS = 1000
+MIN_PROGRESS_STEP = 256 * 1024
+
+# loops which do not see bytes (e.g. over csv.reader rows) call
+# Progress.update() each PROGRESS_ROWS rows with the position of the
+# underlying binary buffer (TextIOWrapper.tell() is too slow)
+PROGRESS_ROWS = 1024
+
+_trace = False
+
+
+def set_trace(enabled):
+    global _trace
+    _trace = bool(enabled)
+
+
+class Progress():
+
+    # usage in a hot loop (pos is a byte counter kept by the caller):
+    #
+    #     progress = Progress(size)
+    #     next_pos = 0
+    #     ...
+    #         if pos >= next_pos:
+    #             next_pos = progress.update(pos, rows)
+    #     ...
+    #     progress.finish(pos, rows)
+    #
+    # with --trace the throughput is printed along with the progress; with
+    # --events the progress is sent as events instead of the messages
+
+    def __init__(self, total):
+        super().__init__()
+
+        self._total = total
+        self._step = max(total // PROGRESS_STEPS, MIN_PROGRESS_STEP)
+        self._percent = None
+
+        self._start_time = time.perf_counter()
+        self._last_time = None
+        self._last_pos = 0
+        self._last_rows = 0
+
+    def update(self, pos, rows=0):
+        now = time.perf_counter()
+
+        if self._last_time is not None \
+                and now - self._last_time < PROGRESS_INTERVAL:
+            return pos + self._step
+
+        if self._total > 0:
+            percent = min(100 * pos // self._total, 100)
+        else:
+            percent = 100
+
+        if is_event_channel_open():
+            send_event("progress", percent=percent, pos=pos, rows=rows,
+                       seconds=now - self._start_time)
+            self._percent = percent
+
+        elif percent != self._percent:
+            echo("Progress: {}%".format(percent))
+            self._percent = percent
+
+        if _trace and self._last_time is not None:
+            self._echo_trace(pos - self._last_pos, rows - self._last_rows,
+                             now - self._last_time)
+
+        self._last_time = now
+        self._last_pos = pos
+        self._last_rows = rows
+
+        return pos + self._step
+
+    def finish(self, pos=None, rows=0):
+        seconds = time.perf_counter() - self._start_time
+
+        if pos is None:
+            pos = self._total
+
+        if is_event_channel_open():
+            send_event("progress", percent=100, pos=pos, rows=rows,
+                       seconds=seconds)
+            send_event("throughput", bytes=pos, rows=rows, seconds=seconds)
+            self._percent = 100
+
+        elif self._percent != 100:
+            echo("Progress: 100%")
+            self._percent = 100
+
+        if _trace:
+            self._echo_trace(pos, rows, seconds, "total")
+
+    @staticmethod
+    def _echo_trace(size, rows, seconds, label="current"):
+        seconds = max(seconds, 1e-6)
+        message = "Trace ({}): {:.1f} MB/s".format(
+            label, size / seconds / 1024 / 1024)
+
+        if rows:
+            message += ", {:.0f} rows/s".format(rows / seconds)
+
+        echo(message)
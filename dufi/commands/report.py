@@ -0,0 +1,197 @@
+# [SublimeLinter @python:3]
+
+import os
+
+
+REPORT_FILE_EXT = ".dufireport"
+REPORT_SIGNATURE = "# dufireport 2"
+
+# ranges are written by batches instead of a flushed write per row
+REPORT_BATCH_SIZE = 4096
+
+# a report looks like this:
+#
+#     # dufireport 2
+#     file: 123456789 1554900000000000000
+#     separator: 44
+#     qualifier: 34
+#     expected: 5
+#     12-15: 4 @1234
+#     20: 6 @5678
+#     rows: 1000000
+#     histogram: 4=4 5=999995 6=1
+#
+# a range is the numbers of the first and the last rows (counted from 1) of
+# a run of consecutive rows with the same unexpected number of separators,
+# the number and the byte offset of the first row of the run; the file line
+# has the size and the mtime of the checked file
+#
+# reports of the previous version have a "N: COUNT" line for each row, the
+# first line has the expected number of separators
+
+
+def get_report_file(file):
+    return file + REPORT_FILE_EXT
+
+
+class ReportWriter():
+
+    def __init__(self, fp, file=None, separator=-1, qualifier=-1,
+                 expected_count=-1):
+        super().__init__()
+
+        self._fp = fp
+        self._lines = [REPORT_SIGNATURE]
+
+        if file is not None:
+            stat = os.stat(file)
+            self._lines.append("file: {} {}".format(stat.st_size,
+                                                    stat.st_mtime_ns))
+
+        self._lines.append("separator: {}".format(separator))
+        self._lines.append("qualifier: {}".format(qualifier))
+
+        self.expected_count = -1
+        self.histogram = {}
+        self._range = None
+
+        if expected_count >= 0:
+            self.set_expected(expected_count)
+
+    def set_expected(self, count):
+        self.expected_count = count
+        self._lines.append("expected: {}".format(count))
+
+    def add(self, n, offset, count):
+        # rows must be added in the order of their numbers
+
+        self.histogram[count] = self.histogram.get(count, 0) + 1
+
+        r = self._range
+
+        if r is not None and r[1] + 1 == n and r[2] == count:
+            r[1] = n
+            return
+
+        if r is not None:
+            self._add_range(r)
+
+        self._range = [n, n, count, offset]
+
+    def _add_range(self, r):
+        first, last, count, offset = r
+
+        if first == last:
+            self._lines.append("{}: {} @{}".format(first, count, offset))
+        else:
+            self._lines.append("{}-{}: {} @{}".format(first, last, count,
+                                                      offset))
+
+        if len(self._lines) >= REPORT_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._lines:
+            self._fp.write("\n".join(self._lines) + "\n")
+            del self._lines[:]
+
+    def close(self, rows):
+        if self._range is not None:
+            self._add_range(self._range)
+            self._range = None
+
+        histogram = dict(self.histogram)
+
+        if self.expected_count >= 0:
+            expected_rows = rows - sum(histogram.values())
+
+            if expected_rows > 0:
+                histogram[self.expected_count] = expected_rows
+
+        self._lines.append("rows: {}".format(rows))
+        self._lines.append("histogram: {}".format(" ".join(
+            "{}={}".format(count, histogram[count])
+            for count in sorted(histogram))))
+
+        self._flush()
+
+
+class Report():
+
+    def __init__(self):
+        super().__init__()
+
+        self.file_size = None
+        self.file_mtime_ns = None
+        self.separator = -1
+        self.qualifier = -1
+        self.expected_count = -1
+        self.rows = None
+        self.ranges = []
+        self.histogram = {}
+
+    def is_valid_for(self, file, separator, qualifier):
+        # whether the report was made for the current content of the file
+        # with the same settings
+
+        stat = os.stat(file)
+        return self.file_size == stat.st_size \
+            and self.file_mtime_ns == stat.st_mtime_ns \
+            and self.separator == separator \
+            and self.qualifier == qualifier
+
+    def iter_rows(self):
+        # yields (row number, count) of each row with an unexpected count
+
+        for first, last, count, _ in self.ranges:
+            for n in range(first, last + 1):
+                yield n, count
+
+
+def read_report(report_file):
+    report = Report()
+
+    with open(report_file, "r") as fp:
+        first_line = fp.readline().rstrip("\n")
+
+        if first_line != REPORT_SIGNATURE:
+            _read_legacy_report(report, first_line, fp)
+            return report
+
+        for line in fp:
+            key, _, value = line.rstrip("\n").partition(": ")
+
+            if key == "file":
+                size, mtime_ns = value.split()
+                report.file_size = int(size)
+                report.file_mtime_ns = int(mtime_ns)
+            elif key == "separator":
+                report.separator = int(value)
+            elif key == "qualifier":
+                report.qualifier = int(value)
+            elif key == "expected":
+                report.expected_count = int(value)
+            elif key == "rows":
+                report.rows = int(value)
+            elif key == "histogram":
+                for item in value.split():
+                    count, rows = item.split("=")
+                    report.histogram[int(count)] = int(rows)
+            else:
+                first, _, last = key.partition("-")
+                count, offset = value.split(" @")
+                report.ranges.append((int(first), int(last or first),
+                                      int(count), int(offset)))
+
+    return report
+
+
+def _read_legacy_report(report, first_line, fp):
+    if not first_line:
+        return
+
+    report.expected_count = int(first_line.split(": ")[1])
+
+    for line in fp:
+        n, count = line.split(": ")
+        report.ranges.append((int(n), int(n), int(count), -1))
@@ -7,13 +7,10 @@ import time
 from collections import namedtuple
 import ctypes
 import json
-import re
 
 import threading
 from queue import Queue
-import subprocess as sp
 
-import traceback
 import locale
 
 import tkinter as tk
@@ -26,6 +23,8 @@ from .boxes.exceptioncatcher import TkExceptionCatcher
 from .balloontip import balloon_tip
 
 from .. import dufi_commands, InvalidCommandArgs, __version__
+from ..utils import get_exe_args
+from ..worker import WorkerPool
 
 
 class CommandExecution():
@@ -37,15 +36,21 @@ class CommandExecution():
 
         self.view = view
 
-        self.proc = None
+        # commands are run by pre-warmed worker processes
+        self.workers = WorkerPool()
+        self.workers.start()
+
+        self.worker = None
         self.timestamp = None
         self.output = None
         self.cancelled = None
         self.files_total = None
         self.files_done = None
+        self.warnings = None
+        self.streams_open = None
 
     def is_running(self):
-        return self.proc and self.proc.poll() is None
+        return self.worker is not None
 
     def run(self):
         if self.is_running():
@@ -56,17 +61,16 @@ class CommandExecution():
         self.cancelled = False
         self.files_total = None
         self.files_done = None
+        self.warnings = 0
 
         self.timestamp = time.time()
-        self.proc = sp.Popen(self._get_cmd(), bufsize=1, stdin=sp.PIPE,
-                             stdout=sp.PIPE, stderr=sp.STDOUT)
-
-        for file in self.view.var.files:
-            self.proc.stdin.write((file + "\n").encode(self.system_encoding))
-
-        self.proc.stdin.close()
+        self.worker = self.workers.acquire()
+        self.worker.submit(self._get_cmd(), self.view.var.files)
 
-        threading.Thread(target=self._read_output).start()
+        # the output and the events of the job are read from separate pipes
+        self.streams_open = 2
+        threading.Thread(target=self._read_output, args=(self.worker, )).start()
+        threading.Thread(target=self._read_events, args=(self.worker, )).start()
 
         self.view.set_execution_running()
         self.view.set_progress(0, 0)
@@ -75,46 +79,53 @@ class CommandExecution():
         self.view.master.after(0, self._consume_output)
 
     def _get_cmd(self):
+        # the worker is dufi itself, so the executable is dropped
         command = dufi_commands[self.view.selected_command]
-        return command.get_cmd_args(self.view)
+        return command.get_cmd_args(self.view)[len(get_exe_args()):]
+
+    def _read_output(self, worker):
+        for line in worker.iter_output():
+            self.output.put(("line", line))
+
+        self.output.put(("end", None))
 
-    def _read_output(self):
-        for line in self.proc.stdout:
-            self.output.put(line)
+    def _read_events(self, worker):
+        for event in worker.iter_events():
+            self.output.put(("event", event))
 
-        self.proc.wait()
-        self.output.put(None)
+        self.output.put(("end", None))
 
     def _consume_output(self):
         output_lines = []
-        finished = False
         progress_current = None
         execution_status = None
 
+        # progress events are coalesced: only the last one is shown
         while not self.output.empty():
-            line = self.output.get()
+            kind, item = self.output.get()
 
-            if line is None:
-                finished = True
-                break
+            if kind == "end":
+                self.streams_open -= 1
 
-            line = line.rstrip().decode(self.system_encoding)
+            elif kind == "line":
+                output_lines.append(
+                    item.rstrip().decode(self.system_encoding))
 
-            m = re.match(r"^Progress: (\d+)%$", line)
+            elif item["event"] == "progress":
+                progress_current = item["percent"]
 
-            if m:
-                progress_current = int(m.group(1))
-                continue
-
-            m = re.match(r"^Processing (\d+)/(\d+): .+$", line)
-
-            if m:
-                execution_status = line
-                self.files_done = int(m.group(1)) - 1
-                self.files_total = int(m.group(2))
+            elif item["event"] == "file_start":
+                execution_status = "Processing {}/{}: {}".format(
+                    item["index"], item["count"],
+                    os.path.basename(item["file"]))
+                self.files_done = item["index"] - 1
+                self.files_total = item["count"]
                 progress_current = 0
 
-            output_lines.append(line)
+            elif item["event"] == "warning":
+                self.warnings += 1
+
+        finished = self.streams_open == 0
 
         if finished and self.cancelled:
             output_lines.append("Command interrupted.")
@@ -125,8 +136,11 @@ class CommandExecution():
         self.view.add_output_lines(output_lines)
 
         if progress_current is not None:
-            progress_overall = (self.files_done * 100 + progress_current) \
-                // self.files_total
+            if self.files_total:
+                progress_overall = (self.files_done * 100
+                                    + progress_current) // self.files_total
+            else:
+                progress_overall = progress_current
 
             self.view.set_progress(progress_overall, progress_current)
 
@@ -138,13 +152,23 @@ class CommandExecution():
             self.view.master.after(100, self._consume_output)
             return
 
+        returncode = self.worker.returncode
+        self.workers.release(self.worker)
+        self.worker = None
+
         if self.cancelled:
             self.view.set_execution_canceled()
-        elif self.proc.returncode != 0:
+        elif returncode != 0:
             self.view.set_execution_error()
         else:
             self.view.set_progress(100, 100)
-            self.view.var.execution_status = "Finished."
+
+            if self.warnings:
+                self.view.var.execution_status = \
+                    "Finished with {} warning(s).".format(self.warnings)
+            else:
+                self.view.var.execution_status = "Finished."
+
             self.view.set_execution_finished()
 
     def interrupt(self):
@@ -155,7 +179,7 @@ class CommandExecution():
             return False
 
         self.cancelled = True
-        self.proc.terminate()
+        self.worker.terminate()
         return True
 
 
@@ -464,6 +488,10 @@ class Application(boxes.GUIApplication):
         if interrupted is None or interrupted:
             self.close_window()
 
+    def close_window(self, event=None):
+        self.cmd.workers.close()
+        super().close_window(event)
+
     def on_button_save_settings(self, event=None):
         command_name = self.selected_command
         command = dufi_commands[command_name]
@@ -791,18 +819,8 @@ def main(argv=sys.argv):
         ctypes.windll.user32.SetProcessDPIAware()
 
     if len(argv) > 1:
-        from ..cli import main as main_
-
-        try:
-            return main_(argv)
-        except SystemExit as e:
-            return e.code
-        except:
-            if sys.stderr is None or sys.stderr.closed:
-                raise
-
-            traceback.print_exception(*sys.exc_info(), file=sys.stderr)
-            return 1
+        from ..cli import run
+        return run(argv)
 
     boxes.utils.set_system_encoding()
     boxes.utils.set_dpi_aware()
@@ -19,5 +19,15 @@ def get_base_path():
     return os.path.dirname(os.path.abspath(prog_path))
 
 
+def get_exe_args():
+    # the command line which starts dufi itself
+    args = [sys.executable, ]
+
+    if not getattr(sys, "frozen", False):
+        args.append(sys.argv[0])
+
+    return args
+
+
 def get_resources_path(*args):
     return os.path.join(get_base_path(), "resources", *args)
@@ -0,0 +1,274 @@
+# [SublimeLinter @python:3]
+
+import sys
+import os
+import io
+import json
+import signal
+import threading
+import subprocess as sp
+
+from .commands.events import open_event_channel, send_event, read_events
+from .utils import get_exe_args
+
+
+# the gui runs commands by worker processes started in advance, so a command
+# does not wait for the startup of python and the imports of dufi; a worker
+# reads jobs from stdin (a JSON line per job), prints the output of the job
+# to stdout and ends it by a control line (a JSON message after NUL); the
+# events of the job (see events.py) are sent to a separate pipe and end by
+# the exit event
+#
+#     dufi --worker EVENTS_FD
+WORKER_ARG = "--worker"
+WORKER_CONTROL_PREFIX = "\0"
+
+# workers kept by the gui; the worker of a finished job is reused by the
+# next one, the other one is warmed up to replace a cancelled job
+WORKER_POOL_SIZE = 2
+
+
+def serve(events=None):
+    # the loop of a worker process; it exits when stdin is closed
+
+    from .cli import run
+
+    stdin = sys.stdin
+    options = ["--events", str(events)] if events is not None else []
+
+    while True:
+        line = stdin.readline()
+
+        if not line:
+            break
+
+        job = json.loads(line)
+
+        # commands read the list of files from stdin
+        sys.stdin = io.StringIO("".join(file + "\n" for file in job["files"]))
+
+        try:
+            code = run(["dufi"] + options + job["args"])
+        finally:
+            sys.stdin = stdin
+
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            code = 1
+
+        sys.stderr.flush()
+        _send_control({"event": "exit", "code": code})
+
+        # the channel is opened again if the command line was invalid
+        open_event_channel(events)
+        send_event("exit", code=code)
+
+    return 0
+
+
+def _send_control(message):
+    sys.stdout.flush()
+    sys.stdout.write(WORKER_CONTROL_PREFIX + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+class Worker():
+
+    def __init__(self):
+        super().__init__()
+
+        events_r, events_w = os.pipe()
+
+        # only the write end of the pipe is inherited by the worker; the
+        # worker gets its own process group (a job object on Windows), so
+        # the processes started by a command are terminated along with it
+        if sys.platform == "win32":
+            import msvcrt
+            events_arg = msvcrt.get_osfhandle(events_w)
+            os.set_handle_inheritable(events_arg, True)
+            startupinfo = sp.STARTUPINFO()
+            startupinfo.lpAttributeList = {"handle_list": [events_arg]}
+            kwargs = {"startupinfo": startupinfo}
+        else:
+            events_arg = events_w
+            kwargs = {"pass_fds": (events_w, ), "start_new_session": True}
+
+        try:
+            self.proc = sp.Popen(
+                get_exe_args() + [WORKER_ARG, str(events_arg)],
+                stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.STDOUT, **kwargs)
+        finally:
+            os.close(events_w)
+
+        if sys.platform == "win32":
+            self._job = _create_job_object(self.proc)
+        else:
+            self._job = None
+
+        self.events = open(events_r, "rb")
+        self.returncode = None
+        self.terminated = False
+
+    def is_alive(self):
+        # a terminated worker may still be running for a while
+        return not self.terminated and self.proc.poll() is None
+
+    def submit(self, args, files):
+        # args are the command line of the command without the executable;
+        # if the worker has died, the job ends as soon as its output is read
+
+        self.returncode = None
+
+        job = json.dumps({"args": args, "files": files})
+
+        try:
+            self.proc.stdin.write((job + "\n").encode("ascii"))
+            self.proc.stdin.flush()
+        except OSError:
+            self.terminated = True
+
+    def iter_output(self):
+        # yields the output lines (bytes) of the current job; the exit code
+        # is set at the end; if the worker is terminated, its exit code is
+        # the one of the job
+
+        prefix = WORKER_CONTROL_PREFIX.encode("ascii")
+
+        for line in self.proc.stdout:
+            if line.startswith(prefix):
+                message = json.loads(line[len(prefix):].decode("ascii"))
+
+                if message["event"] == "exit":
+                    self.returncode = message["code"]
+                    return
+
+                continue
+
+            yield line
+
+        self.returncode = self.proc.wait()
+
+    def iter_events(self):
+        # yields the events of the current job without the exit event
+
+        for event in read_events(self.events):
+            if event["event"] == "exit":
+                return
+
+            yield event
+
+    def terminate(self):
+        # the worker is never reused after that
+        self.terminated = True
+
+        if self._job is not None:
+            import win32job
+            win32job.TerminateJobObject(self._job, 1)
+            return
+
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def close(self):
+        # an idle worker exits when its stdin is closed
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+
+        self.events.close()
+
+
+def _create_job_object(proc):
+    # the processes of the job object are killed when the worker is
+    # terminated or the gui exits; the processes started by the worker join
+    # the job object as well
+
+    import win32api
+    import win32con
+    import win32job
+
+    job = win32job.CreateJobObject(None, "")
+    info = win32job.QueryInformationJobObject(
+        job, win32job.JobObjectExtendedLimitInformation)
+    info["BasicLimitInformation"]["LimitFlags"] |= \
+        win32job.JOB_OBJECT_LIMIT_KILL_ON_JOB_CLOSE
+    win32job.SetInformationJobObject(
+        job, win32job.JobObjectExtendedLimitInformation, info)
+
+    handle = win32api.OpenProcess(
+        win32con.PROCESS_SET_QUOTA | win32con.PROCESS_TERMINATE, False,
+        proc.pid)
+
+    try:
+        win32job.AssignProcessToJobObject(job, handle)
+    finally:
+        win32api.CloseHandle(handle)
+
+    return job
+
+
+class WorkerPool():
+
+    # keeps up to `size` workers: the busy ones and the idle ones
+
+    def __init__(self, size=WORKER_POOL_SIZE):
+        super().__init__()
+
+        self.size = size
+        self._idle = []
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        # starts idle workers up to the size of the pool; they import dufi
+        # in the background
+        with self._lock:
+            while len(self._idle) + self._busy < self.size:
+                self._idle.insert(0, Worker())
+
+    def acquire(self):
+        # the most recently used worker is taken first since it is surely
+        # warmed up
+
+        with self._lock:
+            worker = None
+
+            while self._idle:
+                worker = self._idle.pop()
+
+                if worker.is_alive():
+                    break
+
+                worker = None
+
+            self._busy += 1
+
+        if worker is None:
+            worker = Worker()
+
+        self.start()
+        return worker
+
+    def release(self, worker):
+        # a terminated worker is dropped and replaced by a new one
+
+        with self._lock:
+            self._busy -= 1
+
+            if worker.is_alive() and len(self._idle) + self._busy < self.size:
+                self._idle.append(worker)
+                return
+
+        worker.close()
+        self.start()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for worker in idle:
+            worker.close()